@@ -1,13 +1,14 @@
 import os
 import sys
 import pandas as pd
-import re
+import functools
 import dash_bootstrap_components as dbc
 import plotly.express as px
 
 from pprint import pprint
 from functions import *
-from dash import Dash, html, dcc, Output, Input, State
+from jobs import cancel_job, submit_job
+from dash import Dash, html, dcc, Output, Input, State, ctx, no_update, ALL
 
 app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 
@@ -17,6 +18,7 @@ else:
     data_dir = ""
 
 app.layout = dbc.Container([
+    dcc.Location(id="url"),
     dbc.Row([
         dbc.Col(
             [
@@ -41,6 +43,12 @@ app.layout = dbc.Container([
                 html.Div(
                     dbc.Button("Add Plot", color="primary", style={"width": "100%"}, id="setting-selector-button")
                 ),
+                dbc.Switch(
+                    id="steady-state-switch",
+                    label="Steady-state only (drop the MSER-5 warm-up)",
+                    value=False,
+                    style={"marginTop": "1vh"}
+                ),
                 html.Div([dbc.ListGroup(
                     generate_toc()
                 )], style={"marginBottom": "10vh"}),
@@ -52,6 +60,7 @@ app.layout = dbc.Container([
             [
                 html.Div(id="alert-container"),
                 html.Div(id="combinations-container"),
+                generate_sweep_section(),
                 html.Div(id="participant-allocation-container"),
                 generate_metric_output_content("Latency", "latency"),
                 generate_metric_output_content("Throughput", "throughput"),
@@ -59,18 +68,17 @@ app.layout = dbc.Container([
                 generate_metric_output_content("Total Samples Received", "total-samples-received"),
                 generate_metric_output_content("Lost Samples", "lost-samples"),
                 html.Div(id="system-logs-container", children=[
-                    html.Div([
-                        html.H3("CPU Usage", id="cpu-usage-title"),
-                        html.Div(id="cpu-usage-output")
-                    ]),
-                    html.Div([
-                        html.H3("RAM Usage", id="ram-usage-title"),
-                        html.Div(id="ram-usage-output")
-                    ]),
-                    html.Div([
-                        html.H3("Network Usage", id="network-usage-title"),
-                        html.Div(id="network-usage-output")
-                    ])
+                    dcc.Dropdown(
+                        [{"label": "All VMs (min/mean/max)", "value": ALL_VMS}],
+                        value=ALL_VMS,
+                        clearable=False,
+                        id="system-vm-dropdown",
+                        style={"marginTop": "1vh", "marginBottom": "1vh"}
+                    ),
+                    generate_section("CPU Usage", "cpu-usage"),
+                    generate_section("RAM Usage", "ram-usage"),
+                    generate_section("Network Usage", "network-usage"),
+                    generate_section("Time-Aligned Overlay", "timeline")
                 ])
             ], 
             width=9,
@@ -97,7 +105,7 @@ def populate_dropdown(testpath):
 
     test_summaries, errors = get_test_summaries(testpath)
     
-    comb_output = get_comb_output(test_summaries)
+    comb_output = get_comb_output(test_summaries, get_test_settings_values(testpath) if test_summaries else [])
         
         
     if len(errors) > 0:
@@ -120,280 +128,191 @@ def populate_dropdown(testpath):
     ],
     [
         State("testdir", "children"),
-        State("setting-selection-container", "children")
+        State({"type": "setting-dropdown", "index": ALL}, "value")
     ]
 )
-def get_test_selection(n_clicks, tests, testdir, children):
+def get_test_selection(n_clicks, tests, testdir, values):
     
     if n_clicks is None:
         return tests
     else:
-        values = []
-        
-        children = children['props']['children']
-        
-        for child in children:
-            if child['type'] == 'Col':
-                dropdowns = child['props']['children']
-                for dropdown in dropdowns:
-                    if dropdown['type'] == 'Dropdown':
-                        values.append(dropdown['props']['value'])
-        
-        test_selection = "_".join(values)
+        # ? Each dropdown holds one or more values (or "vary") for one setting
+        matched_tests = select_tests(testdir, values)
         
-        if 'vary' in test_selection:
-            regex_pattern = re.sub(r'vary', r'.*', test_selection)
-            
-            test_data = [_.replace("_summary.csv", "") for _ in os.listdir(testdir)]
-            
-            matched_tests = [test for test in test_data if re.match(regex_pattern, test)]
-            
-            if len(matched_tests) > 0:
-                if tests:
-                    tests.extend(matched_tests)
-                else:
-                    tests = matched_tests
-                tests = sorted(tests, key=custom_key)
-            
-            return tests
+        if len(matched_tests) > 0:
+            tests = list(dict.fromkeys((tests or []) + matched_tests))
+            tests = sorted(tests, key=custom_key)
             
-        else:
-            # ? Check if test_selection exists
-            test_selection_exists = len([_ for _ in os.listdir(testdir) if test_selection in _]) > 0
-        
-            if test_selection_exists:
-                if tests:
-                    tests.append(test_selection)
-                else:
-                    tests = [test_selection]
-                tests = sorted(tests, key=custom_key)
-                
-            return tests
+        return tests
 
 @app.callback(
-    [
-        Output("participant-allocation-container", "children"),
-        
-        Output("latency-summary-output", "children"),
-        Output("latency-boxplot-output", "children"),
-        Output("latency-dotplot-output", "children"),
-        Output("latency-lineplot-output", "children"),
-        Output("latency-histogram-output", "children"),
-        Output("latency-cdf-output", "children"),
-        Output("latency-transient-output", "children"),
-        
-        Output("throughput-summary-output", "children"),
-        Output("throughput-boxplot-output", "children"),
-        Output("throughput-dotplot-output", "children"),
-        Output("throughput-lineplot-output", "children"),
-        Output("throughput-histogram-output", "children"),
-        Output("throughput-cdf-output", "children"),
-        Output("throughput-transient-output", "children"),
-        
-        Output("sample-rate-summary-output", "children"),
-        Output("sample-rate-boxplot-output", "children"),
-        Output("sample-rate-dotplot-output", "children"),
-        Output("sample-rate-lineplot-output", "children"),
-        Output("sample-rate-histogram-output", "children"),
-        Output("sample-rate-cdf-output", "children"),
-        Output("sample-rate-transient-output", "children"),
-        
-        Output("total-samples-received-barchart-output", "children"),
-        
-        Output("lost-samples-barchart-output", "children"),
-        
-        Output("cpu-usage-output", "children"),
-        Output("ram-usage-output", "children"),
-        Output("network-usage-output", "children"),
-        
-    ],
+    Output("participant-allocation-container", "children"),
     [
         Input("test-dropdown", "value"),
         Input("testdir", "children")
     ]
 )
-def populate_summary(tests, testdir):
-
-    if tests is None:
-        return "", "", "", "", "", "", "", "", "", "", "", "", "", "", "", "", "", "", "", "", "", "", "", "", "", "", ""
-    
-    lat_summaries = []
-    tp_summaries = []
-    sample_rate_summaries = []
-    
-    lat_dfs = []
-    tp_dfs = []
-    sr_dfs = []
-    total_samples_received_dfs = []
-    lost_samples_dfs = []
-    participant_allocation_dfs = []
+def populate_participant_allocation(tests, testdir):
+    if not tests:
+        return ""
     
-    cpu_usage_output_children = []
-    mem_usage_output_children = []
-    network_usage_output_children = []
+    return get_participant_allocation_section(tests, testdir)
+
+def register_section_toggle(section_id):
+    @app.callback(
+        Output(f"{section_id}-collapse", "is_open"),
+        [
+            Input(f"{section_id}-title", "n_clicks"),
+            Input("url", "hash")
+        ],
+        State(f"{section_id}-collapse", "is_open")
+    )
+    def toggle_section(n_clicks, hash, is_open):
+        if ctx.triggered_id == f"{section_id}-title":
+            return not is_open
+        
+        # ? Following the section's link in the table of contents opens it
+        return is_open or hash == f"#{section_id}-title"
+
+def register_job_callback(section_id, inputs, submit):
+    """
+    Output of a section computed as a background job. submit gets the values
+    of inputs, submits the section's job (or job group) and returns its id, or
+    returns None to empty the section.
     
-    for test in tests:
-        summary_file = os.path.join(testdir, f"{test}_summary.csv")
-        if not os.path.exists(summary_file):
-            console.print(f"Summmary file doesn't exist for {test}.", style="bold red")
-            continue
-        
-        # ! Limit file reading to 10,000 rows or Dash will break
-        summary_df = pd.read_csv(summary_file, nrows=10000)
-        
-        testname = test
-        test = os.path.join(testdir, test)
-        
-        participant_allocation_dfs.append({
-            testname: get_participant_allocation_df(summary_df)
-        })
-        
-        lat_df = summary_df["latency_us"]
-        # ? Convert microseconds to milliseconds
-        lat_df = lat_df.loc[:].div(1000)
-        lat_dfs.append(lat_df.rename(testname))
-        lat_summary_stats = get_summary_stats(lat_df, test)
-        lat_summaries.append(lat_summary_stats)
-        
-        tp_df = summary_df["total_throughput_mbps"].dropna()
-        tp_dfs.append(tp_df.rename(testname))
-        tp_summary_stats = get_summary_stats(tp_df, test)
-        tp_summaries.append(tp_summary_stats)
-        
-        sample_rate_df = summary_df["total_sample_rate"].dropna()
-        sr_dfs.append(sample_rate_df.rename(testname))
-        sample_rate_summary_stats = get_summary_stats(sample_rate_df, test)
-        sample_rate_summaries.append(sample_rate_summary_stats)
-        
-        total_samples_received_df = get_total_samples_received_per_sub(summary_df)
-        total_samples_received_dfs.append(total_samples_received_df.rename(testname))
+    A progress placeholder is shown as soon as the job is submitted and the
+    section's timer polls the job until its output is ready. Whenever the inputs
+    change (or the section is closed) the previous job is cancelled. A job that
+    disappears before its output was collected is submitted again.
+    """
+    @app.callback(
+        [
+            Output(f"{section_id}-output", "children"),
+            Output(f"{section_id}-job", "data"),
+            Output(f"{section_id}-interval", "disabled")
+        ],
+        inputs + [Input(f"{section_id}-interval", "n_intervals")],
+        State(f"{section_id}-job", "data")
+    )
+    def populate_section(*args):
+        *values, n_intervals, job_id = args
+        
+        if ctx.triggered_id == f"{section_id}-interval":
+            # ? A late tick after the output was already collected
+            if job_id is None:
+                return no_update, no_update, True
+            
+            output = get_job_output(job_id)
+            if output is not None:
+                return output
         
-        lost_samples_df = get_lost_samples_received_per_sub(summary_df)
-        lost_samples_dfs.append(lost_samples_df.rename(testname))
+        cancel_job(job_id)
         
-        cpu_cols = [col for col in summary_df.columns if "_cpu" in col]
-        mem_cols = [col for col in summary_df.columns if "_mem" in col and "_kbmem" in col]
-        network_packets_cols = [col for col in summary_df.columns if ("_dev" in col or "_dev" in col) and "pck" in col or "_mcst" in col or "_rxerr" in col]
-        network_kbs_cols = [col for col in summary_df.columns if ("_dev" in col or "_dev" in col) and "_rxkB" in col or "_txkB" in col]
+        job_id = submit(*values)
+        if job_id is None:
+            return "", None, True
         
-        cpu_fig = go.Figure()
-        mem_fig = go.Figure()
-        network_packets_fig = go.Figure()
-        network_kbs_fig = go.Figure()
+        return get_job_placeholder({"state": "queued"}), job_id, False
+
+def register_section(section_id, render, inputs=[], background=False, submit=None):
+    """
+    Each section has its own callbacks and is only rendered while it's open so
+    that one slow section doesn't hold up the rest of the page. Background
+    sections are rendered in the job pool instead of the request thread, by
+    one render job unless submit is given to split them up.
+    
+    The values of any extra inputs are passed on to render (or submit) after tests and testdir.
+    """
+    register_section_toggle(section_id)
+    
+    section_inputs = [
+        Input(f"{section_id}-collapse", "is_open"),
+        Input("test-dropdown", "value"),
+        Input("testdir", "children")
+    ] + inputs
+    
+    if background:
+        submit = submit or functools.partial(submit_job, render)
         
-        for col in sorted(cpu_cols):
-            
-            cpu_fig.add_trace(
-                go.Scatter(y=summary_df[col].dropna(), mode="lines", name=col)
-            )
-            
-        for col in sorted(mem_cols):
-            
-            mem_fig.add_trace(
-                go.Scatter(y=summary_df[col].dropna(), mode="lines", name=col)
-            )
-            
-        for col in sorted(network_packets_cols):
-            
-            if "rxpck" in col:
-                plot_name = col.replace("_rxpck", "_incoming")
-            elif "txpck" in col:
-                plot_name = col.replace("_txpck", "_outgoing")
-            elif "rxmcst" in col:
-                plot_name = col.replace("_rxmcst", "_incoming_multicast")
-            elif "rxerr" in col:
-                plot_name = col.replace("_rxerr", "_incoming_multicast")
-            
-            network_packets_fig.add_trace(
-                go.Scatter(y=summary_df[col].dropna(), mode="lines", name=plot_name)
-            )
+        def submit_section(is_open, tests, testdir, *args):
+            if not is_open or not tests:
+                return None
             
-        for col in sorted(network_kbs_cols):
-            
-            if "rxkB" in col:
-                plot_name = col.replace("_rxkB", "_incoming")
-            elif "txkB" in col:
-                plot_name = col.replace("_txkB", "_outgoing")
-                
-            network_kbs_fig.add_trace(
-                go.Scatter(y=summary_df[col].dropna(), mode="lines", name=plot_name)
-            )
-        
-        cpu_fig.update_layout(
-            xaxis_title="Time (s)",
-            yaxis_title="CPU %"
-        )
-        
-        mem_fig.update_layout(
-            xaxis_title="Time (s)",
-            yaxis_title="Memory (KB)"
-        )
+            return submit(tests, testdir, *args)
         
-        network_packets_fig.update_layout(
-            xaxis_title="Time (s)",
-            yaxis_title="Packets Per Second"
-        )
+        register_job_callback(section_id, section_inputs, submit_section)
+        return
+    
+    @app.callback(Output(f"{section_id}-output", "children"), section_inputs)
+    def populate_section(is_open, tests, testdir, *args):
+        if not is_open or not tests:
+            return ""
         
-        network_kbs_fig.update_layout(
-            xaxis_title="Time (s)",
-            yaxis_title="KB/s"
+        return render(tests, testdir, *args)
+
+for metric in METRIC_COLUMNS:
+    for section in METRIC_SECTIONS:
+        register_section(
+            f"{metric}-{section}",
+            functools.partial(get_metric_section_output, metric, section),
+            [Input("steady-state-switch", "value")],
+            section in BACKGROUND_SECTIONS,
+            # ? The confidence intervals are computed in a job per test
+            functools.partial(submit_summary_section_jobs, metric) if section == "summary" else None
         )
-        
-        cpu_usage_test_output = html.Div([
-            html.H3(f"{testname} CPU Usage Line Plots"),
-            dcc.Graph(figure=cpu_fig)
-        ])
-        
-        mem_usage_test_output = html.Div([
-            html.H3(f"{testname} RAM Usage Line Plots"),
-            dcc.Graph(figure=mem_fig)
-        ])
-        
-        network_usage_test_output = html.Div([
-            html.H3(f"{testname} Network Usage Line Plots"),
-            dcc.Graph(figure=network_packets_fig),
-            dcc.Graph(figure=network_kbs_fig)
-        ])
-        
-        cpu_usage_output_children.append(cpu_usage_test_output)
-        mem_usage_output_children.append(mem_usage_test_output)
-        network_usage_output_children.append(network_usage_test_output)
 
-    participant_allocation_output = get_participant_allocation_output(participant_allocation_dfs)
+for metric in ["total-samples-received", "lost-samples"]:
+    register_section(f"{metric}-barchart", functools.partial(get_samples_barchart_output, metric))
 
-    lat_summary_table = generate_summary_table(lat_summaries)
-    lat_boxplot = get_plot("box", lat_dfs, "Test", "Latency (ms)") if lat_dfs is not None else None
-    lat_dotplot = get_plot("dot", lat_dfs, "Number of Observations over Increasing Time", "Latency (ms)") if lat_dfs else None
-    lat_lineplot = get_plot("line", lat_dfs, "Number of Observations over Increasing Time", "Latency (ms)") if lat_dfs else None
-    lat_histogram = get_plot("histogram", lat_dfs, "Latency (ms)", "Number of Observations") if lat_dfs else None
-    lat_cdf = get_plot("cdf", lat_dfs, "Latency (ms)", "F(x)") if lat_dfs else None
-    lat_transient = get_transient_analysis(lat_dfs , "Latency (ms)")
+SYSTEM_SECTIONS = ["cpu-usage", "ram-usage", "network-usage"]
 
-    tp_summary_table = generate_summary_table(tp_summaries)
-    tp_boxplot = get_plot("box", tp_dfs, "Test", "Total Throughput (Mbps)") if tp_dfs else None
-    tp_dotplot = get_plot("dot", tp_dfs, "Increasing Time In Seconds", "Total Throughput (Mbps)") if tp_dfs else None
-    tp_lineplot = get_plot("line", tp_dfs, "Increasing Time In Seconds", "Total Throughput (Mbps)") if tp_dfs else None
-    tp_histogram = get_plot("histogram", tp_dfs, "Total Throughput (Mbps)", "Number of Observations") if tp_dfs else None
-    tp_cdf = get_plot("cdf", tp_dfs, "Total Throughput (Mbps)", "F(x)") if tp_dfs else None
-    tp_transient = get_transient_analysis(tp_dfs, "Total Throughput (Mbps)")
+for section in SYSTEM_SECTIONS:
+    register_section(
+        section,
+        functools.partial(get_system_usage_output, section),
+        [Input("system-vm-dropdown", "value")]
+    )
+
+@app.callback(
+    Output("system-vm-dropdown", "options"),
+    [
+        Input("test-dropdown", "value"),
+        Input("testdir", "children")
+    ] + [Input(f"{section}-collapse", "is_open") for section in SYSTEM_SECTIONS]
+)
+def populate_system_vm_dropdown(tests, testdir, *is_open):
+    # ? The options need every test's sar frames, which aren't worth loading until a system section is open
+    if not any(is_open):
+        return no_update
     
-    sample_rate_summary_table = generate_summary_table(sample_rate_summaries)
-    sr_boxplot = get_plot("box", sr_dfs, "Test", "Sample Rate (samples/s)") if sr_dfs else None
-    sr_dotplot = get_plot("dot", sr_dfs, "Increasing Time In Seconds", "Sample Rate (samples/s)") if sr_dfs else None
-    sr_lineplot = get_plot("line", sr_dfs, "Increasing Time In Seconds", "Sample Rate (samples/s)") if sr_dfs else None
-    sr_histogram = get_plot("histogram", sr_dfs, "Sample Rate (samples/s)", "Number of Observations") if sr_dfs else None
-    sr_cdf = get_plot("cdf", sr_dfs, "Sample Rate (samples/s)", "F(x)") if sr_dfs else None
-    sr_transient = get_transient_analysis(sr_dfs, "Sample Rates (samples/s)")
+    return get_system_vm_options(tests, testdir)
+
+register_section("timeline", get_timeline_output)
+
+register_section_toggle("sweep")
+
+def submit_sweep_job(is_open, testdir, x, series, stat, use_filters, values):
+    if not is_open or not testdir or not os.path.isdir(testdir):
+        return None
     
-    total_samples_received_barchart = get_plot("bar", total_samples_received_dfs, "sub_n", "# of samples")
+    # ? The sidebar dropdowns start on each setting's first value, so they only filter once asked to
+    filters = get_setting_filters(values) if use_filters else {}
     
-    lost_samples_received_barchart = get_plot("bar", lost_samples_dfs, "sub_n", "# of samples")
-        
-    cpu_usage_output = html.Div(cpu_usage_output_children)
-    ram_usage_output = html.Div(mem_usage_output_children)
-    network_usage_output = html.Div(network_usage_output_children)
-        
-    return participant_allocation_output, lat_summary_table, lat_boxplot, lat_dotplot, lat_lineplot, lat_histogram, lat_cdf, lat_transient, tp_summary_table, tp_boxplot, tp_dotplot, tp_lineplot, tp_histogram, tp_cdf, tp_transient, sample_rate_summary_table, sr_boxplot, sr_dotplot, sr_lineplot, sr_histogram, sr_cdf, sr_transient, total_samples_received_barchart, lost_samples_received_barchart, cpu_usage_output, ram_usage_output, network_usage_output
+    return submit_job(get_sweep_output, testdir, x, series, stat, filters)
+
+register_job_callback(
+    "sweep",
+    [
+        Input("sweep-collapse", "is_open"),
+        Input("testdir", "children"),
+        Input("sweep-x-dropdown", "value"),
+        Input("sweep-series-dropdown", "value"),
+        Input("sweep-stat-dropdown", "value"),
+        Input("sweep-filter-switch", "value"),
+        Input({"type": "setting-dropdown", "index": ALL}, "value")
+    ],
+    submit_sweep_job
+)
 
 if __name__ == "__main__": 
     app.run_server(debug=True, host="127.0.0.1", port="6745")
\ No newline at end of file
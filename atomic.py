@@ -0,0 +1,17 @@
+import os
+import threading
+
+def write_atomically(path, write):
+    """
+    Call write(tmp_path) and then rename tmp_path to path, so a crash mid-write
+    never leaves a partial file at path. The temporary file is removed if write fails.
+    """
+    # ? Unique per process and thread, the dashboard writes from several of both
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
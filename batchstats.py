@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+from statistics import NormalDist
+
+# ? Tail percentiles reported next to the quartiles, these are what the latency SLOs are about
+SUMMARY_PERCENTILES = {"p90": .9, "p99": .99, "p99.9": .999, "p99.99": .9999}
+
+def get_batch_layout(dfs, divisor=1):
+    """
+    Values of all series back to back with NaNs dropped and divided by divisor,
+    plus where each series starts and how long it is.
+    """
+    arrays = [pd.to_numeric(df, errors="coerce").dropna().to_numpy(dtype=float) for df in dfs]
+    counts = np.array([len(array) for array in arrays], dtype=int)
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(int)
+    
+    values = np.concatenate(arrays) if len(arrays) > 0 else np.array([], dtype=float)
+    
+    # ? In place on the layout, the series themselves may be memory-mapped
+    if divisor != 1:
+        values /= divisor
+    
+    return values, offsets, counts
+
+def get_batch_quantiles(sorted_values, offsets, counts, quantiles):
+    """
+    Quantiles of every series from the sorted values, interpolated linearly
+    between ranks like pandas. Returns one row per series and a column per quantile.
+    """
+    quantiles = np.asarray(quantiles, dtype=float)
+    
+    ranks = (counts[:, None] - 1) * quantiles[None, :]
+    lower = np.floor(ranks).astype(int)
+    upper = np.minimum(lower + 1, np.maximum(counts[:, None] - 1, 0))
+    fraction = ranks - lower
+    
+    lower_values = sorted_values[offsets[:, None] + lower]
+    upper_values = sorted_values[offsets[:, None] + upper]
+    
+    return lower_values + (upper_values - lower_values) * fraction
+
+def get_batch_summary_stats(dfs, divisor=1):
+    """
+    Summary stats of many series in one vectorised pass: the series are laid
+    out back to back, the moments come from sums over each slice of that layout and all
+    quantiles come from sorting the layout once.
+    
+    Returns a stats dict per series, named after the series, in the same order,
+    in the series' unit divided by divisor. Series without any values get NaN stats.
+    """
+    names = [df.name for df in dfs]
+    summaries = [None] * len(dfs)
+    
+    values, offsets, counts = get_batch_layout(dfs, divisor)
+    
+    # ? Only series with values go through the maths, the rest are filled in with NaN below
+    present = np.flatnonzero(counts > 0)
+    offsets, counts = offsets[present], counts[present]
+    
+    if len(present) > 0:
+        n = counts.astype(float)
+        
+        mean = np.add.reduceat(values, offsets) / n
+        centered = values - np.repeat(mean, counts)
+        squared = centered * centered
+        m2 = np.add.reduceat(squared, offsets)
+        m3 = np.add.reduceat(squared * centered, offsets)
+        del centered, squared
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = np.where(n > 1, m2 / (n - 1), np.nan)
+            # ? Adjusted Fisher-Pearson skew, as pandas computes it
+            skew = np.where(
+                n > 2,
+                np.where(m2 > 0, np.sqrt(n * (n - 1)) / (n - 2) * (m3 / n) / (m2 / n) ** 1.5, 0.0),
+                np.nan
+            )
+            margin = NormalDist().inv_cdf((1 + .95) / 2) * np.sqrt(variance / n)
+        
+        # ? Each series is a contiguous slice so they're sorted in place one after the other
+        sorted_values = values.copy()
+        for offset, count in zip(offsets, counts):
+            sorted_values[offset:offset + count].sort()
+        
+        quantiles = {"lower_quartile": .25, "median": .5, "upper_quartile": .75}
+        quantiles.update(SUMMARY_PERCENTILES)
+        quantile_values = get_batch_quantiles(sorted_values, offsets, counts, list(quantiles.values()))
+        
+        minimum = sorted_values[offsets]
+        maximum = sorted_values[offsets + counts - 1]
+        
+        for i, position in enumerate(present):
+            summary = {"test": names[position], "count": int(counts[i]), "mean": mean[i]}
+            summary.update({name: quantile_values[i, j] for j, name in enumerate(quantiles)})
+            summary.update({
+                "variance": variance[i],
+                "std": np.sqrt(variance[i]),
+                "skew": skew[i],
+                "range": maximum[i] - minimum[i],
+                "interquartile_range": summary["upper_quartile"] - summary["lower_quartile"],
+                "min": minimum[i],
+                "max": maximum[i],
+                "confidence_interval_95": (mean[i] - margin[i], mean[i] + margin[i])
+            })
+            summaries[position] = summary
+    
+    for position, summary in enumerate(summaries):
+        if summary is None:
+            summaries[position] = get_empty_summary_stats(names[position])
+    
+    return summaries
+
+def get_empty_summary_stats(test):
+    stats = ["mean", "median", "variance", "std", "skew", "range", "lower_quartile", "upper_quartile", "interquartile_range", "min", "max"]
+    
+    summary = {"test": test, "count": 0}
+    summary.update({stat: np.nan for stat in stats + list(SUMMARY_PERCENTILES)})
+    summary["confidence_interval_95"] = (np.nan, np.nan)
+    
+    return summary
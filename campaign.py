@@ -0,0 +1,395 @@
+import io
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from rich.console import Console
+from statistics import NormalDist
+from atomic import write_atomically
+from sketch import get_sketch_quantiles
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+console = Console()
+
+# ? Summary column and unit conversion used for each metric
+METRIC_COLUMNS = {
+    "latency": ("latency_us", 1000),
+    "throughput": ("total_throughput_mbps", 1),
+    "sample-rate": ("total_sample_rate", 1),
+}
+
+# ? Names of the underscore separated settings in a test name
+SETTING_NAMES = ["duration", "datalen", "pubs", "subs", "reliability", "cast", "durability", "lat_count"]
+
+# ? Percentiles kept in each test's aggregates
+AGGREGATE_QUANTILES = {"p50": .5, "p90": .9, "p99": .99, "p99.9": .999}
+
+# ? Values a latency array is created for, it doubles whenever it fills up
+LATENCY_ARRAY_CAPACITY = 1_000_000
+
+INDEX_FILENAME = "index.json"
+AGGREGATES_FILENAME = "aggregates.csv"
+
+def get_summary_path(testdir, test):
+    """
+    Return the path of the test's summary, preferring the typed parquet file over the csv.
+    """
+    parquet_path = os.path.join(testdir, f"{test}_summary.parquet")
+    
+    if pq is not None and os.path.exists(parquet_path):
+        return parquet_path
+    
+    return os.path.join(testdir, f"{test}_summary.csv")
+
+def read_summary(summary_file, columns=None):
+    """
+    Read a _summary.parquet or _summary.csv file.
+    
+    columns limits the read to the given columns (missing ones are ignored).
+    """
+    if summary_file.endswith(".parquet"):
+        if columns is not None:
+            schema = pq.read_schema(summary_file)
+            columns = [col for col in schema.names if col in columns]
+        return pd.read_parquet(summary_file, columns=columns)
+    
+    usecols = (lambda col: col in columns) if columns is not None else None
+    
+    return pd.read_csv(summary_file, usecols=usecols)
+
+def read_summary_columns(summary_file):
+    """
+    Column names of a summary without reading any of its rows.
+    """
+    if summary_file.endswith(".parquet"):
+        return list(pq.read_schema(summary_file).names)
+    
+    return list(pd.read_csv(summary_file, nrows=0).columns)
+
+def get_test_settings(test):
+    return os.path.basename(test).split("_")
+
+def build_metric_aggregates(count, mean, std, minimum, maximum, percentiles, confidence=0.95, divisor=1):
+    """
+    Aggregates dict of a series from its stats in its stored unit, divided by
+    divisor (e.g. μs to ms).
+    """
+    mean, std = mean / divisor, std / divisor
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    half_width = z * std / np.sqrt(count)
+    
+    aggregates = {
+        "count": int(count),
+        "mean": float(mean),
+        "std": float(std),
+        "min": float(minimum) / divisor,
+        "max": float(maximum) / divisor,
+        "ci95_low": float(mean - half_width),
+        "ci95_high": float(mean + half_width)
+    }
+    
+    for name, percentile in zip(AGGREGATE_QUANTILES, percentiles):
+        aggregates[name] = float(percentile) / divisor
+        
+    return aggregates
+
+def get_metric_aggregates(df, confidence=0.95, divisor=1):
+    """
+    Aggregates of a summary column, ignoring missing values.
+    """
+    values = pd.to_numeric(pd.Series(df), errors="coerce").dropna().to_numpy(dtype=float)
+    
+    if len(values) == 0:
+        return {"count": 0}
+    
+    return build_metric_aggregates(
+        len(values),
+        values.mean(),
+        values.std(ddof=1) if len(values) > 1 else 0.0,
+        values.min(),
+        values.max(),
+        np.quantile(values, list(AGGREGATE_QUANTILES.values())),
+        confidence,
+        divisor
+    )
+
+def get_sketch_aggregates(sketch, confidence=0.95, divisor=1):
+    """
+    The aggregates get_metric_aggregates gives for a series, from a sketch of
+    it instead, so the series never has to be in memory. Count, mean, std, min
+    and max are exact, the percentiles are within the sketch's relative accuracy.
+    """
+    count = sketch["count"]
+    
+    if count == 0:
+        return {"count": 0}
+    
+    m2 = sketch.get("m2")
+    std = np.nan if m2 is None else np.sqrt(m2 / (count - 1)) if count > 1 else 0.0
+    
+    return build_metric_aggregates(
+        count,
+        sketch["sum"] / count,
+        std,
+        sketch["min"],
+        sketch["max"],
+        get_sketch_quantiles(sketch, list(AGGREGATE_QUANTILES.values())),
+        confidence,
+        divisor
+    )
+
+def get_test_aggregates(summary_df, latency_sketch=None):
+    """
+    Per-metric aggregates (count, mean, std, min, max, percentiles, 95% CI) and
+    the sample loss of one test's summary.
+    
+    The latency aggregates come from latency_sketch (in μs) instead of the
+    summary's latency column when it's given.
+    """
+    aggregates = {}
+    
+    for metric, (column, divisor) in METRIC_COLUMNS.items():
+        if metric == "latency" and latency_sketch is not None:
+            aggregates[metric] = get_sketch_aggregates(latency_sketch, divisor=divisor)
+            continue
+        
+        if column in summary_df.columns:
+            df = pd.to_numeric(summary_df[column], errors="coerce")
+        else:
+            df = pd.Series(dtype=float)
+        aggregates[metric] = get_metric_aggregates(df, divisor=divisor)
+    
+    received = pd.to_numeric(summary_df.get("total_samples_received", pd.Series(dtype=float)), errors="coerce").max()
+    lost = pd.to_numeric(summary_df.get("total_samples_lost", pd.Series(dtype=float)), errors="coerce").max()
+    
+    aggregates["samples"] = {
+        "received": None if pd.isna(received) else float(received),
+        "lost": None if pd.isna(lost) else float(lost),
+        "loss_percent": float(lost / (received + lost) * 100) if not pd.isna(received) and not pd.isna(lost) and received + lost > 0 else None
+    }
+    
+    return aggregates
+
+def get_aggregates_path(summaries_dir, test):
+    return os.path.join(summaries_dir, f"{os.path.basename(test)}_aggregates.json")
+
+def get_latency_sketch_path(summaries_dir, test):
+    return os.path.join(summaries_dir, f"{os.path.basename(test)}_latency_sketch.json")
+
+def get_latency_array_path(summaries_dir, test):
+    return os.path.join(summaries_dir, f"{os.path.basename(test)}_latency.npy")
+
+def get_sar_path(summaries_dir, test):
+    return os.path.join(summaries_dir, f"{os.path.basename(test)}_sar.csv")
+
+def get_timeline_path(summaries_dir, test):
+    return os.path.join(summaries_dir, f"{os.path.basename(test)}_timeline.csv")
+
+def get_summary_test(summary_file):
+    """
+    Name of the test a _summary.csv or _summary.parquet file belongs to.
+    """
+    return os.path.basename(summary_file).rsplit("_summary", 1)[0]
+
+def get_summary_latency_array_path(summary_file):
+    return get_latency_array_path(os.path.dirname(summary_file), get_summary_test(summary_file))
+
+def get_summary_sar_path(summary_file):
+    return get_sar_path(os.path.dirname(summary_file), get_summary_test(summary_file))
+
+def get_summary_timeline_path(summary_file):
+    return get_timeline_path(os.path.dirname(summary_file), get_summary_test(summary_file))
+
+def write_latency_array(path, chunks, capacity=LATENCY_ARRAY_CAPACITY):
+    """
+    Stream float chunks straight into a .npy latency array, so only one chunk
+    is ever in memory. Returns how many values were written.
+    
+    The file starts out with room for capacity values, doubles whenever a chunk
+    doesn't fit and is cut to the real count once all chunks are in.
+    """
+    count = 0
+    
+    def write(tmp_path):
+        nonlocal count
+        
+        array = np.lib.format.open_memmap(tmp_path, mode="w+", dtype="float64", shape=(max(capacity, 1),))
+        
+        for chunk in chunks:
+            if count + len(chunk) > len(array):
+                length = max(2 * len(array), count + len(chunk))
+                array.flush()
+                del array
+                
+                set_latency_array_length(tmp_path, length)
+                array = np.load(tmp_path, mmap_mode="r+")
+            
+            array[count:count + len(chunk)] = chunk
+            count += len(chunk)
+        
+        array.flush()
+        del array
+        
+        set_latency_array_length(tmp_path, count)
+    
+    write_atomically(path, write)
+    
+    return count
+
+def set_latency_array_length(path, length):
+    """
+    Rewrite a .npy file's header for length values, cutting off the values past
+    them or adding zeros up to them.
+    """
+    with open(path, "r+b") as f:
+        np.lib.format.read_magic(f)
+        _, _, dtype = np.lib.format.read_array_header_1_0(f)
+        data_offset = f.tell()
+        
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(header, {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (length,)})
+        
+        # ? numpy pads headers so the shape can change without moving the data
+        if len(header.getvalue()) != data_offset:
+            raise ValueError(f"Can't resize {path} in place.")
+        
+        f.seek(0)
+        f.write(header.getvalue())
+        f.truncate(data_offset + length * dtype.itemsize)
+
+def load_latency_array(path):
+    """
+    Memory-map a latency array read-only: nothing is read until it's sliced and
+    processes opening the same file share it through the page cache.
+    """
+    return np.load(path, mmap_mode="r")
+
+def get_index_entry(summaries_dir, test):
+    summary_file = get_summary_path(summaries_dir, test)
+    aggregates_path = get_aggregates_path(summaries_dir, test)
+    
+    # ? process.py writes the aggregates next to the summary, older summaries are read instead
+    if os.path.exists(aggregates_path) and os.path.getmtime(aggregates_path) >= os.path.getmtime(summary_file):
+        with open(aggregates_path, "r") as f:
+            stats = json.load(f)
+    else:
+        columns = [column for column, _ in METRIC_COLUMNS.values()] + ["total_samples_received", "total_samples_lost"]
+        stats = get_test_aggregates(read_summary(summary_file, columns))
+    
+    csv_name = f"{test}_summary.csv"
+    parquet_name = f"{test}_summary.parquet"
+    
+    return {
+        "settings": get_test_settings(test),
+        "files": {
+            "csv": csv_name if os.path.exists(os.path.join(summaries_dir, csv_name)) else None,
+            "parquet": parquet_name if os.path.exists(os.path.join(summaries_dir, parquet_name)) else None
+        },
+        "summary_mtime": os.path.getmtime(summary_file),
+        "stats": stats
+    }
+
+def load_campaign_index(summaries_dir):
+    index_path = os.path.join(summaries_dir, INDEX_FILENAME)
+    
+    if not os.path.exists(index_path):
+        return {"tests": {}}
+    
+    try:
+        with open(index_path, "r") as f:
+            return json.load(f)
+    except json.JSONDecodeError as e:
+        console.print(f"Rebuilding unreadable index {index_path}: {e}", style="bold red")
+        return {"tests": {}}
+
+def save_campaign_index(summaries_dir, index):
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+    
+    write_atomically(os.path.join(summaries_dir, INDEX_FILENAME), write)
+
+def get_aggregates_table(index):
+    """
+    One row per test: its settings followed by <metric>_<stat> columns.
+    """
+    rows = []
+    
+    for test, entry in index["tests"].items():
+        row = {"test": test}
+        
+        for name, value in zip(SETTING_NAMES, entry["settings"]):
+            row[name] = value
+            
+        for metric, stats in entry["stats"].items():
+            for stat, value in stats.items():
+                row[f"{metric}_{stat}"] = value
+                
+        rows.append(row)
+        
+    return pd.DataFrame(rows)
+
+def save_aggregates_table(summaries_dir, index):
+    table = get_aggregates_table(index)
+    
+    write_atomically(os.path.join(summaries_dir, AGGREGATES_FILENAME), lambda tmp_path: table.to_csv(tmp_path, index=False))
+
+def update_campaign_index(summaries_dir, index=None):
+    """
+    Bring the campaign index up to date with the summaries in summaries_dir.
+    
+    Only tests whose summary is new or has a different mtime are read, and the
+    index is only written back when something changed. Nothing is written to
+    folders without any summaries (unless they already have an index), so
+    looking at an arbitrary folder from the visualiser leaves it untouched.
+    """
+    if index is None:
+        index = load_campaign_index(summaries_dir)
+    
+    summary_tests = set()
+    
+    for entry in os.scandir(summaries_dir):
+        if not entry.is_file():
+            continue
+        
+        for suffix in ["_summary.csv", "_summary.parquet"]:
+            if entry.name.endswith(suffix):
+                summary_tests.add(entry.name.replace(suffix, ""))
+    
+    changed = False
+    
+    for test in list(index["tests"]):
+        if test not in summary_tests:
+            del index["tests"][test]
+            changed = True
+    
+    for test in summary_tests:
+        summary_mtime = os.path.getmtime(get_summary_path(summaries_dir, test))
+        entry = index["tests"].get(test)
+        
+        if entry is not None and entry["summary_mtime"] == summary_mtime:
+            continue
+        
+        try:
+            index["tests"][test] = get_index_entry(summaries_dir, test)
+        except Exception as e:
+            console.print(f"Couldn't index {test}: {e}", style="bold red")
+            continue
+        
+        changed = True
+        
+    if len(index["tests"]) == 0 and not os.path.exists(os.path.join(summaries_dir, INDEX_FILENAME)):
+        return index
+    
+    if changed:
+        save_campaign_index(summaries_dir, index)
+    
+    if changed or not os.path.exists(os.path.join(summaries_dir, AGGREGATES_FILENAME)):
+        save_aggregates_table(summaries_dir, index)
+        
+    return index
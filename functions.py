@@ -6,77 +6,761 @@ import plotly.express as px
 import plotly.graph_objects as go
 import operator
 import functools
+import collections
+import hashlib
+import pickle
+import time
 
 from pprint import pprint
+from plotly.colors import hex_to_rgb
 from plotly.subplots import make_subplots
 from rich.console import Console
 from statistics import NormalDist
 from scipy import stats
-from dash import Dash, html, dcc, Output, Input
+from dash import Dash, html, dcc, Output, Input, no_update
 from random import randrange, sample
+from batchstats import SUMMARY_PERCENTILES, get_batch_summary_stats
+from intervals import get_confidence_intervals
+from jobs import JOB_WORKERS, get_job_status, in_job_worker, report_progress, submit_job_group
+from campaign import METRIC_COLUMNS, SETTING_NAMES, AGGREGATES_FILENAME, get_summary_path, get_latency_sketch_path, get_summary_latency_array_path, get_summary_sar_path, get_summary_timeline_path, load_latency_array, read_summary, read_summary_columns, load_campaign_index, update_campaign_index
+from perftest import read_latencies
+from sar import get_sar_df_from_summary, load_sar_df, parse_sar_column_name, read_sar_logs
+from sketch import get_sketch_cdf, get_sketch_quantiles, load_sketch, merge_sketches
+from timeline import load_timeline
+from atomic import write_atomically
 
 console = Console()
 
+# ? Most points a single trace sends to the browser
+MAX_POINTS_PER_TRACE = 5000
+
+# ? Most points all traces of one figure send to the browser together
+MAX_POINTS_PER_FIGURE = 20000
+
+# ? Dot and line traces with at least this many points are drawn with WebGL
+WEBGL_MIN_POINTS = 1000
+
+# ? (row label, stat) of the summary stats table, the 95% confidence interval comes last
+SUMMARY_TABLE_ROWS = [
+    ("Count", "count"),
+    ("mean", "mean"),
+    ("median", "median"),
+    ("variance", "variance"),
+    ("std", "std"),
+    ("skew", "skew"),
+    ("range", "range"),
+    ("lower_quartile", "lower_quartile"),
+    ("upper_quartile", "upper_quartile"),
+    ("interquartile_range", "interquartile_range"),
+    ("min", "min"),
+    ("max", "max")
+] + [(name, name) for name in SUMMARY_PERCENTILES]
+
+# ? (row label, method, stat) of the confidence interval rows under the summary stats
+INTERVAL_TABLE_ROWS = [
+    ("Mean 95% CI (batch means)", "batch_means", "mean"),
+    ("Mean 95% CI (block bootstrap)", "bootstrap", "mean"),
+    ("p99 95% CI (batch means)", "batch_means", "p99"),
+    ("p99 95% CI (block bootstrap)", "bootstrap", "p99")
+]
+
+# ? Quantile above which ECDFs get extra points, and the share of each ECDF's points spent there
+ECDF_TAIL_QUANTILE = .99
+ECDF_TAIL_SHARE = .2
+
+# ? Number of bins of the server-side histograms
+HISTOGRAM_BINS = 100
+
+# ? Sections whose output is computed as a background job, with a progress placeholder shown meanwhile
+BACKGROUND_SECTIONS = ["summary", "cdf", "transient"]
+
+# ? How often (in ms) a section polls its background job
+JOB_POLL_INTERVAL = 500
+
+# ? How many per-test results (frames, stats, traces) are kept in memory, see get_cache_size
+CACHE_SIZE = 256
+
+# ? On-disk cache tier the job workers share their results through, private to the user, an empty PTST_CACHE_DIR turns it off
+CACHE_DIR = os.environ.get("PTST_CACHE_DIR", os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "ptst"))
+
+# ? Most the disk cache may hold, and how long an entry nobody reads is kept
+CACHE_MAX_BYTES = int(os.environ.get("PTST_CACHE_MAX_MB", 1024)) * 1024 * 1024
+CACHE_MAX_AGE = 7 * 24 * 3600
+
+# ? The disk cache is pruned when a process first uses it and then every this many writes
+CACHE_PRUNE_INTERVAL = 50
+
+# ? Axis titles of each metric: (value title, x title of the dot/line plots, transient title)
+METRIC_TITLES = {
+    "latency": ("Latency (ms)", "Number of Observations over Increasing Time", "Latency (ms)"),
+    "throughput": ("Total Throughput (Mbps)", "Increasing Time In Seconds", "Total Throughput (Mbps)"),
+    "sample-rate": ("Sample Rate (samples/s)", "Increasing Time In Seconds", "Sample Rates (samples/s)"),
+}
+
+# ? Percentiles shown in the latency percentile table
+SKETCH_PERCENTILES = {"p50": .5, "p90": .9, "p99": .99, "p99.9": .999, "p99.99": .9999}
+
+# ? Stats of each metric that can be plotted in the parameter sweep
+SWEEP_STATS = ["mean", "p50", "p90", "p99", "p99.9", "std", "min", "max"]
+
+# ? Most points of each system usage trace, whatever the length of the run
+SYSTEM_MAX_POINTS = int(os.environ.get("PTST_SYSTEM_MAX_POINTS", 1000))
+
+# ? VM dropdown value that shows all VMs of a test as min/mean/max bands
+ALL_VMS = "all"
+
+# ? (sar log, metric, trace label) in each system figure and its y axis title
+SYSTEM_FIGURES = {
+    "cpu": ([("cpu", "user", "user"), ("cpu", "system", "system"), ("cpu", "iowait", "iowait"), ("cpu", "idle", "idle")], "CPU %"),
+    "mem": ([("mem", "kbmemfree", "kbmemfree"), ("mem", "kbmemused", "kbmemused")], "Memory (KB)"),
+    "network_packets": ([("dev", "rxpck", "incoming"), ("dev", "txpck", "outgoing"), ("dev", "rxmcst", "incoming_multicast"), ("edev", "rxerr", "incoming_errors")], "Packets Per Second"),
+    "network_kbs": ([("dev", "rxkB", "incoming"), ("dev", "txkB", "outgoing")], "KB/s")
+}
+
+# ? (y axis title, column suffixes) of each panel of the time-aligned overlay
+TIMELINE_PANELS = [
+    ("Latency (ms)", ["latency_mean_us", "latency_p99_us"]),
+    ("Throughput (Mbps)", ["total_throughput_mbps"]),
+    ("CPU Busy %", ["_cpu_idle"]),
+    ("Network In (KB/s)", ["_dev_rxkB"])
+]
+
+# ? Rows of the correlation table under the overlay
+TIMELINE_CORRELATIONS = 10
+
+# ? The other latency series are derived from the same samples so correlating them says nothing
+TIMELINE_EXCLUDED_CORRELATIONS = ["latency_mean_us", "latency_p99_us"]
+
+# ? Sections rendered for each of the METRIC_COLUMNS
+METRIC_SECTIONS = ["summary", "boxplot", "dotplot", "lineplot", "histogram", "cdf", "transient"]
+
+# ? Summary stats and confidence intervals of each (summary file, mtime, metric, steady_state), least recently used first, filled a batch of tests at a time
+summary_stats_cache = collections.OrderedDict()
+confidence_intervals_cache = collections.OrderedDict()
+
+# ? Writes to the disk cache by this process since it was last pruned
+disk_cache_writes = {"count": 0}
+
+# ? Campaign index of each summaries dir (and its inverted settings index), loaded once and then kept up to date
+campaign_indexes = {}
+
+def get_settings_inverted_index(index):
+    """
+    {(setting position, value): set of tests} so that selections become set operations.
+    """
+    inverted_index = {}
+    
+    for test, entry in index["tests"].items():
+        for i, setting in enumerate(entry["settings"]):
+            inverted_index.setdefault((i, setting), set()).add(test)
+            
+    return inverted_index
+
+def refresh_campaign_index(testpath):
+    """
+    The index is only re-checked against the summaries when the folder's mtime
+    changes, i.e. when summaries are added, removed or replaced.
+    """
+    dir_mtime = os.path.getmtime(testpath)
+    
+    if testpath in campaign_indexes and campaign_indexes[testpath]["mtime"] == dir_mtime:
+        return campaign_indexes[testpath]
+    
+    index = campaign_indexes[testpath]["index"] if testpath in campaign_indexes else load_campaign_index(testpath)
+    index = update_campaign_index(testpath, index)
+    
+    # ? Updating the index can itself change the folder's mtime
+    campaign_indexes[testpath] = {
+        "mtime": os.path.getmtime(testpath),
+        "index": index,
+        "inverted_index": get_settings_inverted_index(index)
+    }
+    
+    return campaign_indexes[testpath]
+
+def get_campaign_index(testpath):
+    return refresh_campaign_index(testpath)["index"]
+
+def select_tests(testpath, selections):
+    """
+    Tests matching every setting position of selections.
+    
+    Each selection is a value, a list of accepted values, or "vary" / an empty
+    list to accept any value in that position.
+    """
+    campaign = refresh_campaign_index(testpath)
+    inverted_index = campaign["inverted_index"]
+    
+    matched_tests = set(campaign["index"]["tests"])
+    
+    for i, selection in enumerate(selections):
+        if isinstance(selection, str):
+            selection = [selection]
+        
+        if not selection or "vary" in selection:
+            continue
+        
+        accepted_tests = set()
+        for value in selection:
+            accepted_tests |= inverted_index.get((i, value), set())
+            
+        matched_tests &= accepted_tests
+        
+    return sorted(matched_tests, key=custom_key)
+
 def get_test_summaries(testpath):
     test_summaries = []
     errors = []
 
-    if not os.path.exists(testpath):
+    if not testpath or not os.path.isdir(testpath):
         errors.append(f"The path {testpath} does NOT exist.")
         return test_summaries, errors
 
-    testpath_children = [x for x in os.listdir(testpath)]
-    testpath_children = [os.path.join(testpath, x) for x in testpath_children]
+    test_summaries = sorted(get_campaign_index(testpath)["tests"])
+    
+    if len(test_summaries) == 0:
+        errors.append(f"No summary files found in {testpath}.")
+        return test_summaries, errors
 
-    testpath_files = [x for x in testpath_children if not os.path.isdir(x)]
+    return test_summaries, errors
 
-    if len(testpath_files) == 0:
-        errors.append(f"No files found in {testpath}.")
-        return
+def get_test_settings_values(testpath):
+    """
+    Sorted distinct values of each settings position across the campaign.
+    """
+    index = get_campaign_index(testpath)
+    
+    values = []
+    for entry in index["tests"].values():
+        settings = entry["settings"]
+        while len(values) < len(settings):
+            values.append(set())
+        for i, setting in enumerate(settings):
+            values[i].add(setting)
+            
+    return [sorted(_) for _ in values]
+
+def get_cache_size():
+    """
+    Entries each in-memory cache keeps. The job workers split CACHE_SIZE
+    between them so the pool doesn't hold JOB_WORKERS times as much.
+    """
+    return max(CACHE_SIZE // JOB_WORKERS, 1) if in_job_worker() else CACHE_SIZE
 
-    summary_files = [os.path.basename(_).replace("_summary.csv", "") for _ in testpath_files if '_summary.csv' in _]
+@functools.lru_cache(maxsize=1)
+def get_cache_dir():
+    """
+    CACHE_DIR, created private to this user, or None if the disk tier is off or
+    the folder isn't private: pickles are only loaded from a folder nobody
+    else could have written them to.
+    """
+    if not CACHE_DIR:
+        return None
     
-    if len(summary_files) == 0:
-        errors.append(f"No summary files found in {testpath}.")
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        stat = os.stat(CACHE_DIR)
+    except OSError as e:
+        console.print(f"Not using the disk cache {CACHE_DIR}: {e}", style="bold red")
+        return None
+    
+    if stat.st_uid != os.getuid() or stat.st_mode & 0o077:
+        console.print(f"Not using the disk cache {CACHE_DIR}: it has to belong to you and be closed to everyone else (chmod 700).", style="bold red")
+        return None
+    
+    prune_disk_cache(CACHE_DIR)
+    
+    return CACHE_DIR
+
+def prune_disk_cache(cache_dir):
+    """
+    Delete the entries nobody has read for CACHE_MAX_AGE, then the least
+    recently used ones until the cache fits in CACHE_MAX_BYTES.
+    """
+    entries = []
+    
+    for folder in os.scandir(cache_dir):
+        if not folder.is_dir():
+            continue
+        
+        for entry in os.scandir(folder.path):
+            if not entry.name.endswith(".pkl"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    
+    entries.sort()
+    total_size = sum(size for _, size, _ in entries)
+    now = time.time()
+    
+    for used, size, path in entries:
+        if now - used < CACHE_MAX_AGE and total_size <= CACHE_MAX_BYTES:
+            break
+        
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        
+        total_size -= size
+
+def get_disk_cache_path(cache_dir, name, key):
+    """
+    Entries are <name>/<file hash>_<mtime>_<key hash>.pkl for keys starting with
+    (file, mtime), so the ones left behind by older versions of a file can be found.
+    """
+    file_hash = hashlib.sha1(repr(key[0]).encode()).hexdigest()
+    key_hash = hashlib.sha1(repr(key).encode()).hexdigest()
+    
+    return os.path.join(cache_dir, name, f"{file_hash}_{key[1]!r}_{key_hash}.pkl")
+
+def load_from_disk_cache(name, key):
+    """
+    The result stored under name and key in the disk cache, or None if there isn't one.
+    """
+    cache_dir = get_cache_dir()
+    
+    if cache_dir is None:
+        return None
+    
+    cache_path = get_disk_cache_path(cache_dir, name, key)
+    
+    try:
+        with open(cache_path, "rb") as f:
+            result = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        console.print(f"Ignoring unreadable cache file {cache_path}: {e}", style="bold red")
+        return None
+    
+    # ? Reading an entry counts as using it, see prune_disk_cache
+    try:
+        os.utime(cache_path)
+    except OSError:
+        pass
+    
+    return result
+
+def save_to_disk_cache(name, key, result):
+    cache_dir = get_cache_dir()
+    
+    if cache_dir is None:
         return
+    
+    cache_path = get_disk_cache_path(cache_dir, name, key)
+    folder, filename = os.path.split(cache_path)
+    file_hash, mtime, _ = filename.split("_")
+    
+    os.makedirs(folder, mode=0o700, exist_ok=True)
+    
+    # ? Entries of the file's older versions can never be read again
+    for entry in os.scandir(folder):
+        if entry.name.startswith(f"{file_hash}_") and entry.name.split("_")[1] != mtime:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+    
+    def write(tmp_path):
+        with open(tmp_path, "wb") as f:
+            pickle.dump(result, f)
+    
+    write_atomically(cache_path, write)
+    
+    disk_cache_writes["count"] += 1
+    if disk_cache_writes["count"] % CACHE_PRUNE_INTERVAL == 0:
+        prune_disk_cache(cache_dir)
 
-    test_summaries = summary_files
+def read_from_disk_cache(func, key, args):
+    """
+    Load func's result for key from CACHE_DIR, computing it as func(*args) and
+    storing it if missing.
+    """
+    result = load_from_disk_cache(func.__name__, key)
+    
+    if result is None:
+        result = func(*args)
+        save_to_disk_cache(func.__name__, key, result)
+    
+    return result
 
-    return test_summaries, errors
+def cache_by_mtime(func=None, disk=True):
+    """
+    Memoise func(summary_file, *args) on the summary's path + mtime.
+    
+    Results live in a bounded LRU in memory and, unless disk is False, in
+    CACHE_DIR where the job workers and later runs of the app find them.
+    Rewriting a summary changes its mtime so stale results are never used.
+    Callers must treat the returned objects as read-only.
+    """
+    if func is None:
+        return functools.partial(cache_by_mtime, disk=disk)
+    
+    def compute(summary_file, mtime, *args):
+        if not disk:
+            return func(summary_file, *args)
+        
+        return read_from_disk_cache(func, (summary_file, mtime) + args, (summary_file,) + args)
+    
+    memory_cache = None
+    
+    @functools.wraps(func)
+    def wrapper(summary_file, *args):
+        nonlocal memory_cache
+        
+        # ? Sized on first use, a job worker imports this module before it knows it's one
+        if memory_cache is None:
+            memory_cache = functools.lru_cache(maxsize=get_cache_size())(compute)
+        
+        return memory_cache(summary_file, os.path.getmtime(summary_file), *args)
+    
+    return wrapper
 
-def get_summary_stats(df, test):
-    count = len(df.index)
-    mean = df.mean()
-    median = df.median()
-    variance = df.var()
-    std = df.std()
-    skew = df.skew()
-    df_range = df.max() - df.min()
-    lower_quartile = df.quantile(.25)
-    upper_quartile = df.quantile(.75)
-    interquartile_range = upper_quartile - lower_quartile
-    df_min = df.min()
-    df_max = df.max()
-    conf_int_95 = stats.norm.interval(0.95, loc=df.mean(), scale=stats.sem(df))
-    
-    summary_stats =  {
-        "test": test, 
-        "count": count, 
-        "mean": mean, 
-        "median": median, 
-        "variance": variance, 
-        "std": std, 
-        "skew": skew, 
-        "range": df_range, 
-        "lower_quartile": lower_quartile, 
-        "upper_quartile": upper_quartile, 
-        "interquartile_range": interquartile_range, 
-        "min": df_min,
-        "max": df_max,
-        "confidence_interval_95": conf_int_95
-    }
+@cache_by_mtime
+def load_summary_columns(summary_file):
+    return read_summary_columns(summary_file)
+
+@cache_by_mtime
+def load_summary(summary_file, columns=None):
+    """
+    The summary, or only the given columns of it (a tuple, so it can be cached).
+    Parquet summaries then skip every other column entirely.
+    """
+    return read_summary(summary_file, list(columns) if columns is not None else None)
+
+def load_summary_columns_like(summary_file, matches):
+    """
+    The summary's columns whose names satisfy matches(column).
+    """
+    return load_summary(summary_file, tuple(col for col in load_summary_columns(summary_file) if matches(col)))
+
+# ? Memory only: the latencies are memory-mapped already and pickling them would copy them to disk
+@cache_by_mtime(disk=False)
+def get_metric_df(summary_file, metric, steady_state=False):
+    """
+    The metric's series from the summary in the unit it's stored in. With
+    steady_state the warm-up detected by MSER-5 is removed.
+    
+    Latencies stay memory-mapped (the cache only holds the mapping), so callers
+    convert the slices or results they show with the metric's divisor.
+    """
+    column = METRIC_COLUMNS[metric][0]
+    
+    latency_array_path = get_summary_latency_array_path(summary_file)
+    
+    # ? Latencies are memory-mapped from process.py's array rather than parsed out of the summary
+    if metric == "latency" and os.path.exists(latency_array_path) and os.path.getmtime(latency_array_path) >= os.path.getmtime(summary_file):
+        df = pd.Series(load_latency_array(latency_array_path), name=column, copy=False)
+    else:
+        summary_df = load_summary(summary_file, (column,))
+        
+        if column not in summary_df.columns:
+            return pd.Series(dtype=float, name=column)
+        
+        df = pd.to_numeric(summary_df[column], errors="coerce")
+    
+    # ? Only series with gaps are copied
+    if df.isna().any():
+        df = df.dropna()
+    
+    if steady_state:
+        df = get_steady_state_df(df)
+    
+    return df
+
+def get_tests_keys(summary_files, metric, steady_state):
+    return [(summary_file, os.path.getmtime(summary_file), metric, steady_state) for _, summary_file in summary_files]
+
+def get_cached_tests_results(cache, name, keys):
+    """
+    Results of the keys found in cache or in CACHE_DIR under name, by key.
+    Hits become the most recently used entries of cache.
+    """
+    results = {}
+    
+    for key in keys:
+        if key in cache:
+            cache.move_to_end(key)
+            results[key] = cache[key]
+            continue
+        
+        # ? Each job worker has its own cache, the others' results are picked up from disk
+        result = load_from_disk_cache(name, key)
+        if result is not None:
+            results[key] = result
+    
+    return results
+
+def add_tests_results(cache, results):
+    """
+    Keep the results (by key) in cache as its most recently used entries,
+    dropping the least recently used ones once it's full.
+    """
+    for key, result in results.items():
+        cache[key] = result
+        cache.move_to_end(key)
+    
+    while len(cache) > get_cache_size():
+        cache.popitem(last=False)
+
+def get_tests_results(cache, name, summary_files, metric, steady_state, compute):
+    """
+    Per-test results kept in cache, and in CACHE_DIR under name, keyed on
+    (summary file, mtime, metric, steady_state).
+    
+    compute gets the (test, summary file) of every test that isn't cached yet at
+    once and returns their results in the same order.
+    """
+    keys = get_tests_keys(summary_files, metric, steady_state)
+    results = get_cached_tests_results(cache, name, keys)
+    
+    missing = [(key, test_file) for key, test_file in zip(keys, summary_files) if key not in results]
+    
+    if len(missing) > 0:
+        for (key, _), result in zip(missing, compute([test_file for _, test_file in missing])):
+            results[key] = result
+            save_to_disk_cache(name, key, result)
+    
+    add_tests_results(cache, results)
+    
+    return [results[key] for key in keys]
+
+def get_metric_dfs(summary_files, metric, steady_state=False):
+    """
+    Metric series of every (test, summary file), named after its test, reporting
+    progress as each test is loaded.
+    """
+    dfs = []
+    
+    for i, (test, summary_file) in enumerate(summary_files):
+        report_progress(i, len(summary_files), f"Loading {test}")
+        dfs.append(get_metric_df(summary_file, metric, steady_state).rename(test, copy=False))
+    
+    return dfs
+
+def get_tests_summary_stats(summary_files, metric, steady_state=False):
+    """
+    Summary stats of every (test, summary file). The ones that aren't cached yet
+    are computed together in one batch.
+    """
+    def compute(missing):
+        return get_batch_summary_stats(get_metric_dfs(missing, metric, steady_state), METRIC_COLUMNS[metric][1])
+    
+    return get_tests_results(summary_stats_cache, "summary_stats", summary_files, metric, steady_state, compute)
+
+def get_test_confidence_intervals(summary_file, metric, steady_state=False):
+    return get_confidence_intervals(get_metric_df(summary_file, metric, steady_state).to_numpy(), divisor=METRIC_COLUMNS[metric][1])
+
+def get_tests_confidence_intervals(summary_files, metric, steady_state=False):
+    """
+    Batch-means and block bootstrap intervals of every (test, summary file),
+    computed one test after the other. The summary section spreads them over
+    the workers instead, see submit_summary_section_jobs.
+    """
+    def compute(missing):
+        intervals = []
         
-    return summary_stats
+        for i, (test, summary_file) in enumerate(missing):
+            report_progress(i, len(missing), f"Confidence intervals of {test}")
+            intervals.append(get_test_confidence_intervals(summary_file, metric, steady_state))
+        
+        return intervals
+    
+    return get_tests_results(confidence_intervals_cache, "confidence_intervals", summary_files, metric, steady_state, compute)
+
+def submit_summary_section_jobs(metric, tests, testdir, steady_state=False):
+    """
+    Submit the summary section as a job group and return its id: one job for
+    the summary stats of all tests and one for the confidence intervals of
+    each test that isn't cached yet, which are by far the slowest part. The
+    table is put together from their results once they're all done.
+    """
+    summary_files = get_summary_files(tests, testdir)
+    
+    keys = get_tests_keys(summary_files, metric, steady_state)
+    intervals = get_cached_tests_results(confidence_intervals_cache, "confidence_intervals", keys)
+    missing = [(key, test_file) for key, test_file in zip(keys, summary_files) if key not in intervals]
+    
+    tasks = [(get_tests_summary_stats, (summary_files, metric, steady_state))] if len(summary_files) > 0 else []
+    tasks += [(get_tests_confidence_intervals, ([test_file], metric, steady_state)) for _, test_file in missing]
+    
+    def join(results):
+        if len(summary_files) == 0:
+            return ""
+        
+        summary_stats, *missing_intervals = results
+        
+        # ? The workers already saved them to disk, this keeps them in the web server's memory too
+        computed = {key: test_intervals for (key, _), [test_intervals] in zip(missing, missing_intervals)}
+        add_tests_results(confidence_intervals_cache, computed)
+        intervals.update(computed)
+        
+        return generate_summary_table(summary_stats, [intervals[key] for key in keys])
+    
+    return submit_job_group(tasks, join)
+
+@cache_by_mtime
+def get_test_trace(summary_file, metric, type, testname, steady_state=False, max_points=MAX_POINTS_PER_TRACE, bins=None):
+    return get_trace(type, get_metric_df(summary_file, metric, steady_state).rename(testname, copy=False), max_points, bins, METRIC_COLUMNS[metric][1])
+
+@cache_by_mtime
+def load_latency_sketch(sketch_path):
+    return load_sketch(sketch_path)
+
+@cache_by_mtime
+def load_test_sar_df(summary_file):
+    """
+    The test's long sar frame from process.py, or one rebuilt from the summary's
+    system columns for summaries written before it was saved.
+    """
+    sar_path = get_summary_sar_path(summary_file)
+    
+    if os.path.exists(sar_path) and os.path.getmtime(sar_path) >= os.path.getmtime(summary_file):
+        return load_sar_df(sar_path)
+    
+    return get_sar_df_from_summary(load_summary_columns_like(summary_file, lambda col: parse_sar_column_name(col) is not None))
+
+@cache_by_mtime
+def load_test_timeline(summary_file):
+    """
+    The test's per-second timeline from process.py or None if it hasn't got an up to date one.
+    """
+    timeline_path = get_summary_timeline_path(summary_file)
+    
+    if not os.path.exists(timeline_path) or os.path.getmtime(timeline_path) < os.path.getmtime(summary_file):
+        return None
+    
+    return load_timeline(timeline_path)
+
+@cache_by_mtime
+def get_test_system_figures(summary_file, vm=ALL_VMS, max_points=SYSTEM_MAX_POINTS):
+    return get_system_figures(load_test_sar_df(summary_file), vm, max_points)
+
+@cache_by_mtime
+def load_aggregates_table(table_path):
+    return pd.read_csv(table_path, dtype={name: str for name in SETTING_NAMES})
+
+def query_aggregates(testpath, filters={}, group_by=[], columns=None, agg="mean"):
+    """
+    Per-test aggregates of the campaign computed by process.py, without loading any summaries.
+    
+    filters maps any of SETTING_NAMES to a value or a list of accepted values.
+    columns picks aggregate columns such as "latency_p99" (all of them by default).
+    With group_by the matching tests are combined per group using agg.
+    """
+    # ? Makes sure the index, and so the aggregates table, is up to date
+    index = refresh_campaign_index(testpath)["index"]
+    
+    # ? Folders without summaries have no aggregates table (or an empty one left by older versions)
+    if len(index["tests"]) == 0:
+        table = pd.DataFrame(columns=["test"] + SETTING_NAMES + (columns or []))
+    else:
+        table = load_aggregates_table(os.path.join(testpath, AGGREGATES_FILENAME))
+    
+    for name, values in filters.items():
+        if isinstance(values, str):
+            values = [values]
+        table = table[table[name].isin(values)]
+    
+    if columns is None:
+        columns = [col for col in table.columns if col != "test" and col not in SETTING_NAMES]
+    
+    if len(group_by) == 0:
+        return table[["test"] + SETTING_NAMES + columns].reset_index(drop=True)
+    
+    grouped = table.groupby(group_by)
+    
+    result = grouped[columns].agg(agg)
+    result.insert(0, "tests", grouped.size())
+    
+    return result.reset_index()
+
+def get_vm_band_traces(metric_df, name, color, max_points=SYSTEM_MAX_POINTS):
+    """
+    Min, mean and max across every VM at each second as a shaded band around
+    the mean line, so the number of traces doesn't grow with the number of VMs.
+    
+    Runs longer than max_points seconds are bucketed: each bucket keeps the
+    smallest min, largest max and average mean of its seconds.
+    """
+    per_second = metric_df.groupby("seconds")["value"].agg(["min", "mean", "max"])
+    
+    bucket_size = int(np.ceil(len(per_second.index) / max(max_points, 1)))
+    if bucket_size > 1:
+        buckets = np.arange(len(per_second.index)) // bucket_size
+        x = per_second.index.to_series().groupby(buckets).first().to_numpy()
+        per_second = per_second.groupby(buckets).agg({"min": "min", "mean": "mean", "max": "max"})
+        per_second.index = x
+    
+    r, g, b = hex_to_rgb(color)
+    
+    return [
+        go.Scatter(x=per_second.index, y=per_second["max"], mode="lines", line={"width": 0, "color": color}, legendgroup=name, showlegend=False, name=f"{name} max"),
+        go.Scatter(x=per_second.index, y=per_second["min"], mode="lines", line={"width": 0, "color": color}, fill="tonexty", fillcolor=f"rgba({r}, {g}, {b}, 0.2)", legendgroup=name, showlegend=False, name=f"{name} min"),
+        go.Scatter(x=per_second.index, y=per_second["mean"], mode="lines", line={"color": color}, legendgroup=name, name=f"{name} (VM min/mean/max)")
+    ]
+
+def get_system_figures(sar_df, vm=ALL_VMS, max_points=SYSTEM_MAX_POINTS):
+    """
+    CPU, memory and network figures of one test from its long sar frame, against
+    the seconds since sar's first sample.
+    
+    With vm=ALL_VMS every metric is one min/mean/max band across the VMs,
+    otherwise it's a line per metric of that VM only. Either way each trace has
+    at most max_points points.
+    """
+    sar_df = sar_df.assign(seconds=(sar_df["timestamp"] - sar_df["timestamp"].min()).dt.total_seconds())
+    sar_df = sar_df.dropna(subset=["value"])
+    
+    if vm != ALL_VMS:
+        sar_df = sar_df[sar_df["vm"] == vm]
+    
+    colors = px.colors.qualitative.Plotly
+    
+    figures = {}
+    
+    for figure, (metrics, y_title) in SYSTEM_FIGURES.items():
+        fig = go.Figure()
+        
+        for i, (log, metric, label) in enumerate(metrics):
+            metric_df = sar_df[(sar_df["log"] == log) & (sar_df["metric"] == metric)]
+            
+            if len(metric_df.index) == 0:
+                continue
+            
+            if vm == ALL_VMS:
+                fig.add_traces(get_vm_band_traces(metric_df, f"{log}_{label}", colors[i % len(colors)], max_points))
+            else:
+                df = downsample(metric_df.set_index("seconds")["value"], max_points)
+                fig.add_trace(go.Scatter(x=df.index, y=df, mode="lines", line={"color": colors[i % len(colors)]}, name=f"{vm}_{log}_{label}"))
+        
+        fig.update_layout(
+            xaxis_title="Time (s)",
+            yaxis_title=y_title
+        )
+        
+        figures[figure] = fig.to_plotly_json()
+    
+    return figures
+
+def get_system_vm_options(tests, testdir):
+    """
+    Options of the VM dropdown of the system sections: the band across all VMs
+    followed by each VM of the selected tests.
+    """
+    vms = set()
+    
+    for test, summary_file in get_summary_files(tests or [], testdir):
+        vms |= set(load_test_sar_df(summary_file)["vm"].astype(str))
+    
+    return [{"label": "All VMs (min/mean/max)", "value": ALL_VMS}] + [{"label": vm, "value": vm} for vm in sorted(vms)]
+
+def get_summary_stats(df, test):
+    return get_batch_summary_stats([df.rename(test)])[0]
 
 def get_lat_df(test):
     rundir = os.path.join(test, "run_1")
@@ -94,20 +778,14 @@ def get_lat_df(test):
     
     pubdir = os.path.join(rundir, "pub_0.csv")
     
-    # ! Limit to 50,000 rows or it will break Dash
-    lat_df = pd.read_csv(pubdir, on_bad_lines="skip", skiprows=2, engine="python", nrows=50000).iloc[:-4]
-    
+    # ? Read the whole run in chunks, plots are downsampled before they reach Dash
     try:
-        lat_head = [col for col in lat_df.columns if "latency" in col.lower()][0]
-        lat_df = lat_df[lat_head]
-    except pd.errors.EmptyDataError as e:
-        console.print(e, style="bold red")
-        pprint(lat_df.head())
+        lat_df = pd.Series(read_latencies(pubdir))
     except Exception as e:
         console.print(e, style="bold red")
         return
     
-    lat_df = lat_df.loc[:].div(1000)
+    lat_df = lat_df.div(1000)
     
     return lat_df
 
@@ -139,63 +817,58 @@ def get_df_from_subs(metric_heading, test):
 
 def get_cpu_log_df(test):
     logdir = os.path.join(test, "run_1", "logs")
-    logs = [os.path.join(logdir, file) for file in os.listdir(logdir)]
-    cpu_logs = [file for file in logs if "_cpu.log" in file]
     
-    cpu_logs_data = []
+    try:
+        cpu_df = read_sar_logs(logdir).query("log == 'cpu'")
+    except Exception as e:
+        console.print(f"Ran into exception when trying to read the logs in:\n\t{logdir}.", style="bold red")
+        return pd.DataFrame()
+    
+    times = cpu_df.groupby("vm", observed=True)["timestamp"].agg(["min", "max"]).reset_index()
     
-    for log in cpu_logs:
-        cpu_log_data = {
-            "start": "",
-            "end": "",
-            "vm": os.path.basename(log).replace("_cpu.log", "").replace("csr-dds-", "").replace("app", "vm")
-        }
-        
-        try:
-            log_df = pd.read_csv(log, skiprows=1, skipfooter=1, engine="python", on_bad_lines="skip", delim_whitespace=True)
-        except Exception as e:
-            console.print(f"Ran into exception when trying to read:\n\t{log}.", style="bold red")
-            continue
-        
-        # ? Pick the first column
-        time_df = log_df.iloc[:,0]
-        
-        cpu_log_data["start"] = "1970-01-01 " + str(time_df.min())
-        cpu_log_data["end"] = "1970-01-01 " + str(time_df.max())
-        
-        cpu_logs_data.append(cpu_log_data)
-        
-    return pd.DataFrame(cpu_logs_data)
+    return pd.DataFrame({
+        "start": times["min"].astype(str),
+        "end": times["max"].astype(str),
+        "vm": times["vm"].astype(str).str.replace("csr-dds-", "").str.replace("app", "vm")
+    })
 
-def generate_summary_table(summaries):
+def format_interval(interval):
+    return "{0:,.2f}".format(interval[0]) + ", " + "{0:,.2f}".format(interval[1])
+
+def generate_summary_table(summaries, intervals=None):
+    """
+    Stats of each test side by side. The i.i.d. normal interval is kept for
+    reference, with intervals the batch-means and block bootstrap ones follow it.
+    """
+    interval_rows = []
+    
+    if intervals is not None:
+        # ? Rows no test has an interval for (e.g. p99 by batch means of short series) are left out
+        interval_rows = [
+            html.Tr([html.Td(label)] + [html.Td(format_interval(interval[method][stat])) for interval in intervals])
+            for label, method, stat in INTERVAL_TABLE_ROWS
+            if not all(np.isnan(interval[method][stat][0]) for interval in intervals)
+        ]
+    
     return dbc.Table([
         html.Thead(
             html.Tr(
                 [html.Th("Stat")] + [html.Th( os.path.basename(summary["test"]) ) for summary in summaries]
             )
         ),
-        html.Tbody([
-            html.Tr([html.Td("Count")] + [html.Td("{0:,.2f}".format(summary["count"])) for summary in summaries]),
-            html.Tr([html.Td("mean")] + [html.Td("{0:,.2f}".format(summary["mean"])) for summary in summaries]),
-            html.Tr([html.Td("median")] + [html.Td("{0:,.2f}".format(summary["median"])) for summary in summaries]),
-            html.Tr([html.Td("variance")] + [html.Td("{0:,.2f}".format(summary["variance"])) for summary in summaries]),
-            html.Tr([html.Td("std")] + [html.Td("{0:,.2f}".format(summary["std"])) for summary in summaries]),
-            html.Tr([html.Td("skew")] + [html.Td("{0:,.2f}".format(summary["skew"])) for summary in summaries]),
-            html.Tr([html.Td("range")] + [html.Td("{0:,.2f}".format(summary["range"])) for summary in summaries]),
-            html.Tr([html.Td("lower_quartile")] + [html.Td("{0:,.2f}".format(summary["lower_quartile"])) for summary in summaries]),
-            html.Tr([html.Td("upper_quartile")] + [html.Td("{0:,.2f}".format(summary["upper_quartile"])) for summary in summaries]),
-            html.Tr([html.Td("interquartile_range")] + [html.Td("{0:,.2f}".format(summary["interquartile_range"])) for summary in summaries]),
-            html.Tr([html.Td("min")] + [html.Td("{0:,.2f}".format(summary["min"])) for summary in summaries]),
-            html.Tr([html.Td("max")] + [html.Td("{0:,.2f}".format(summary["max"])) for summary in summaries]),
-            html.Tr(
-                [html.Td("95% Confidence Interval")] + 
-                [
-                    html.Td(
-                        "{0:,.2f}".format(summary["confidence_interval_95"][0]) + ", " + "{0:,.2f}".format(summary["confidence_interval_95"][1])
-                    ) for summary in summaries
-                ]
-            )
-        ])
+        html.Tbody(
+            [
+                html.Tr([html.Td(label)] + [html.Td("{0:,.2f}".format(summary[stat])) for summary in summaries])
+                for label, stat in SUMMARY_TABLE_ROWS
+            ] +
+            [
+                html.Tr(
+                    [html.Td("Mean 95% CI (i.i.d. normal)")] + 
+                    [html.Td(format_interval(summary["confidence_interval_95"])) for summary in summaries]
+                )
+            ] +
+            interval_rows
+        )
     ], bordered=True, hover=True)
     
 def generate_toc_section(title, metric):
@@ -284,12 +957,19 @@ def generate_toc():
     lists.append(generate_toc_section("Sample Rate", "sample-rate"))
     lists.append(generate_toc_section("Total Samples Received", "total-samples-received"))
     lists.append(generate_toc_section("Lost Samples", "lost-samples"))
+    lists.append(
+        [
+            html.H5("Parameter Sweep", style={"marginTop": "1vh"}),
+            dbc.ListGroupItem("Parameter Sweep Plot", href="#sweep-title", external_link=True, style={"marginTop": "0.5vh"})
+        ]
+    )
     lists.append(
         [
             html.H5("System Logs", style={"marginTop": "1vh"}),
             dbc.ListGroupItem("CPU Usage", href="#cpu-usage-title", external_link=True, style={"marginTop": "0.5vh"}),
             dbc.ListGroupItem("RAM Usage", href="#ram-usage-title", external_link=True, style={"marginTop": "0.5vh"}),
-            dbc.ListGroupItem("Network Usage", href="#network-usage-title", external_link=True, style={"marginTop": "0.5vh"})
+            dbc.ListGroupItem("Network Usage", href="#network-usage-title", external_link=True, style={"marginTop": "0.5vh"}),
+            dbc.ListGroupItem("Time-Aligned Overlay", href="#timeline-title", external_link=True, style={"marginTop": "0.5vh"})
         ]
     )
     
@@ -299,62 +979,182 @@ def generate_toc():
         
     return output
 
-def generate_metric_output_content(title, metric):
-    if "lost-samples" in metric or "total-samples" in metric:
-        summary_output = ""
-        boxplot_output = html.Div([
-            html.H3(f"{title} Bar Chart", id=f"{metric}-barchart-title"),
-            html.Div(id=f"{metric}-barchart-output", style={"maxWidth": "100vw", "overflowX": "scroll"})
-        ])
-        lineplot_output = ""
-        dotplot_output = ""
-        histogram_output = ""
-        cdf_output = ""
-        transient_output = ""
+def generate_section(title, section_id, background=False):
+    """
+    Collapsible section whose output is only rendered once it's opened, either by
+    clicking its title or by following its link in the table of contents.
+    
+    Background sections also get the store and timer used to follow their job.
+    """
+    return html.Div([
+        html.H3(title, id=f"{section_id}-title", style={"cursor": "pointer"}),
+        dbc.Collapse(
+            [html.Div(id=f"{section_id}-output", style={"maxWidth": "100vw", "overflowX": "scroll"})] +
+            (generate_job_components(section_id) if background else []),
+            id=f"{section_id}-collapse",
+            is_open=False
+        )
+    ])
+
+def generate_job_components(section_id):
+    return [
+        dcc.Store(id=f"{section_id}-job"),
+        dcc.Interval(id=f"{section_id}-interval", interval=JOB_POLL_INTERVAL, disabled=True)
+    ]
+
+def get_job_placeholder(status):
+    """
+    Shown in a background section until its job is done.
+    """
+    if status["state"] == "queued":
+        label = "Waiting for a worker..."
+    elif status["total"] > 0:
+        label = f"{status['message']} ({status['done'] + 1}/{status['total']})" if status["done"] < status["total"] else status["message"]
     else:
-        summary_output = html.Div([
-            html.H3(title + " Summary Stats", id=metric + "-summary-title"),
-            html.Div(id=metric + "-summary-output", style={"maxWidth": "100vw", "overflowX": "scroll"}),
-        ])
+        label = "Starting..."
     
-        boxplot_output = html.Div([
-            html.H3(title + " Box Plots", id=metric + "-boxplot-title"),
-            html.Div(id=metric + "-boxplot-output", style={"maxWidth": "100vw", "overflowX": "scroll"}),
-        ])
+    percent = 100 * status["done"] / status["total"] if status.get("total", 0) > 0 else 0
     
-        lineplot_output = html.Div([
-            html.H3(title + " Line Plots", id=metric + "-lineplot-title"),
-            html.Div(id=metric + "-lineplot-output", style={"maxWidth": "100vw", "overflowX": "scroll"}),
-        ])
-        
-        dotplot_output = html.Div([
-            html.H3(title + " Dot Plots", id=metric + "-dotplot-title"),
-            html.Div(id=metric + "-dotplot-output", style={"maxWidth": "100vw", "overflowX": "scroll"}),
-        ])
+    return html.Div([
+        dbc.Progress(value=max(percent, 5), striped=True, animated=True, style={"marginTop": "1vh"}),
+        html.P(label, style={"color": "grey", "font-size": "8pt"})
+    ])
+
+def get_job_output(job_id):
+    """
+    (children, job id, timer disabled) of a background section from its job's
+    current status, or None if the job is gone without a result (e.g. the
+    server restarted) and has to be submitted again. The timer is stopped once
+    the job is done or failed.
+    """
+    status = get_job_status(job_id)
+    
+    if status["state"] in ["queued", "running"]:
+        return get_job_placeholder(status), no_update, False
+    
+    if status["state"] == "failed":
+        console.print(f"Background job failed: {status['error']!r}", style="bold red")
+        return dbc.Alert(f"Couldn't compute this section: {status['error']}", color="danger"), None, True
+    
+    if status["state"] == "missing":
+        return None
+    
+    return status["result"], None, True
+
+def generate_sweep_section():
+    """
+    Controls and output of the parameter sweep plot, which is drawn from the
+    campaign's aggregates table rather than from any summaries.
+    """
+    stat_options = [
+        {"label": f"{metric} {stat}", "value": f"{metric}_{stat}"}
+        for metric in METRIC_COLUMNS for stat in SWEEP_STATS
+    ] + [{"label": "lost samples %", "value": "samples_loss_percent"}]
+    
+    return html.Div([
+        html.H3("Parameter Sweep", id="sweep-title", style={"cursor": "pointer"}),
+        dbc.Collapse([
+            dbc.Switch(
+                id="sweep-filter-switch",
+                label="Only use tests matching the sidebar's setting dropdowns (other than the x-axis and series settings)",
+                value=False
+            ),
+            dbc.Row([
+                dbc.Col([
+                    html.Label("X-Axis"),
+                    dcc.Dropdown(id="sweep-x-dropdown", options=SETTING_NAMES, value="subs", clearable=False)
+                ]),
+                dbc.Col([
+                    html.Label("One Line Per"),
+                    dcc.Dropdown(id="sweep-series-dropdown", options=SETTING_NAMES, value="datalen")
+                ]),
+                dbc.Col([
+                    html.Label("Statistic"),
+                    dcc.Dropdown(id="sweep-stat-dropdown", options=stat_options, value="latency_p99", clearable=False)
+                ])
+            ], style={"marginBottom": "1vh"}),
+            html.Div(id="sweep-output", style={"maxWidth": "100vw", "overflowX": "scroll"})
+        ] + generate_job_components("sweep"), id="sweep-collapse", is_open=False)
+    ])
+
+def get_setting_number(value):
+    """
+    Leading number of a setting value such as "32000B" or "25P" (NaN if it has none).
+    """
+    number = ""
+    for char in str(value):
+        if char.isdigit() or (char == "." and number):
+            number += char
+        else:
+            break
         
-        histogram_output = html.Div([
-            html.H3(title + " Histograms", id=metric + "-histogram-title"),
-            html.Div(id=metric + "-histogram-output", style={"maxWidth": "100vw", "overflowX": "scroll"}),
-        ])
+    return float(number) if number else np.nan
+
+def get_sweep_output(testpath, x, series, stat, filters={}):
+    """
+    Plot stat against setting x with one line per value of setting series, using
+    the mean over repeated tests of each combination.
+    """
+    filters = {name: values for name, values in filters.items() if name not in [x, series]}
+    group_by = [x] if not series or series == x else [x, series]
+    
+    df = query_aggregates(testpath, filters, group_by, [stat])
+    
+    if df.empty:
+        return html.P("No tests match the selected settings.")
+    
+    # ? Sort numerically when every value has a number in it, e.g. 1S, 5S, 25S
+    x_numbers = df[x].map(get_setting_number)
+    if not x_numbers.isna().any():
+        df[x] = x_numbers
+    df = df.sort_values(group_by)
+    
+    fig = px.line(
+        df, 
+        x=x, 
+        y=stat, 
+        color=series if len(group_by) > 1 else None, 
+        markers=True, 
+        hover_data=["tests"]
+    )
+    fig.update_layout(xaxis_title=x, yaxis_title=stat)
+    
+    return dcc.Graph(figure=fig)
+
+def get_setting_filters(values):
+    """
+    {setting name: accepted values} for the setting dropdowns that don't vary.
+    """
+    filters = {}
+    
+    for name, value in zip(SETTING_NAMES, values):
+        if isinstance(value, str):
+            value = [value]
+        if not value or "vary" in value:
+            continue
+        filters[name] = value
         
-        cdf_output = html.Div([
-            html.H3(title + " Empirical Cumulative Distribution Functions", id=metric + "-cdf-title"),
-            html.Div(id=metric + "-cdf-output", style={"maxWidth": "100vw", "overflowX": "scroll"}),
+    return filters
+
+def generate_metric_output_content(title, metric):
+    if "lost-samples" in metric or "total-samples" in metric:
+        return html.Div([
+            generate_section(f"{title} Bar Chart", f"{metric}-barchart")
         ])
     
-        transient_output = html.Div([
-            html.H3(title + " Transient Analyses", id=metric + "-transient-title"),
-            html.Div(id=metric + "-transient-output", style={"maxWidth": "100vw", "overflowX": "scroll"})
-        ])
+    sections = [
+        ("Summary Stats", "summary"),
+        ("Box Plots", "boxplot"),
+        ("Line Plots", "lineplot"),
+        ("Dot Plots", "dotplot"),
+        ("Histograms", "histogram"),
+        ("Empirical Cumulative Distribution Functions", "cdf"),
+        ("Transient Analyses", "transient")
+    ]
     
     return html.Div([
-        summary_output,
-        boxplot_output,
-        lineplot_output,
-        dotplot_output,
-        histogram_output,
-        cdf_output,
-        transient_output
+        generate_section(f"{title} {section_title}", f"{metric}-{section}", section in BACKGROUND_SECTIONS)
+        for section_title, section in sections
     ])
     
 def confidence_interval(data, confidence=0.95):
@@ -363,75 +1163,264 @@ def confidence_interval(data, confidence=0.95):
   h = dist.stdev * z / ((len(data) - 1) ** .5)
   return h
     
-def get_plot(type, dfs, x_title, y_title):
-    df = pd.concat(dfs, axis=1)
-        
+def drop_nans(df):
+    """
+    df without its NaNs, copied only if it has any.
+    """
+    # ? The sum is NaN as soon as one value is, and unlike isna() it doesn't allocate a mask as long as the series
+    if len(df.index) > 0 and np.isnan(np.asarray(df, dtype=float).sum()):
+        return df.dropna()
+    
+    return df
+
+def downsample(df, max_points=MAX_POINTS_PER_TRACE):
+    """
+    Min/max bucketing: split the series into max_points / 2 buckets and keep the
+    smallest and largest point of each so that spikes survive the downsampling.
+    
+    The original index is kept so the points stay where they were on the x-axis.
+    """
+    df = drop_nans(df)
+    
+    if len(df.index) <= max_points:
+        return df
+    
+    bucket_size = int(np.ceil(len(df.index) / max(max_points // 2, 1)))
+    
+    # ? The whole buckets are a reshaped view of the (memory-mapped) values, the last partial one is done on its own
+    values = np.asarray(df, dtype=float)
+    full_count = len(values) // bucket_size
+    buckets = values[:full_count * bucket_size].reshape(full_count, bucket_size)
+    
+    # ? Row by row because argmin(axis=1) copies read-only arrays such as the memmap first
+    offsets = np.arange(full_count) * bucket_size
+    positions = [
+        offsets + np.array([bucket.argmin() for bucket in buckets], dtype=int),
+        offsets + np.array([bucket.argmax() for bucket in buckets], dtype=int)
+    ]
+    
+    tail = values[full_count * bucket_size:]
+    if len(tail) > 0:
+        positions.append(full_count * bucket_size + np.array([tail.argmin(), tail.argmax()]))
+    
+    return df.iloc[np.unique(np.concatenate(positions))]
+
+def thin(df, max_points=MAX_POINTS_PER_TRACE):
+    """
+    Evenly spaced subsample of the series for distribution plots.
+    """
+    df = drop_nans(df)
+    
+    if len(df.index) <= max_points:
+        return df
+    
+    positions = np.linspace(0, len(df.index) - 1, max_points).astype(int)
+    
+    return df.iloc[positions]
+
+def get_box_trace(df, divisor=1):
+    """
+    Box trace from quartiles computed over the full series instead of the raw
+    points, divided by divisor.
+    """
+    values = np.asarray(drop_nans(df), dtype=float)
+    
+    if len(values) == 0:
+        return go.Box(name=df.name)
+    
+    q1, median, q3 = np.quantile(values, [.25, .5, .75])
+    iqr = q3 - q1
+    
+    # ? Reductions with where= instead of boolean indexing, which would copy the values inside the fences
+    lowerfence = values.min(where=values >= q1 - 1.5 * iqr, initial=np.inf)
+    upperfence = values.max(where=values <= q3 + 1.5 * iqr, initial=-np.inf)
+    
+    return go.Box(
+        name=df.name,
+        q1=[q1 / divisor],
+        median=[median / divisor],
+        q3=[q3 / divisor],
+        lowerfence=[lowerfence / divisor],
+        upperfence=[upperfence / divisor],
+        mean=[values.mean() / divisor]
+    )
+
+def get_ecdf_positions(n, max_points=MAX_POINTS_PER_TRACE):
+    """
+    Ranks of the sorted series that are kept for its ECDF.
+    
+    Up to ECDF_TAIL_QUANTILE the ranks are evenly spaced. Above it they're
+    evenly spaced in log(1 - F), so p99.9, p99.99, ... keep their resolution
+    however long the series is. The largest value is always kept.
+    """
+    if n <= max_points:
+        return np.arange(n)
+    
+    tail_points = int(max_points * ECDF_TAIL_SHARE)
+    tail_start = int(ECDF_TAIL_QUANTILE * (n - 1))
+    
+    body = np.linspace(0, tail_start, max_points - tail_points)
+    # ? 1 - F goes from 1 - ECDF_TAIL_QUANTILE down to 1 / n
+    tail = n - np.geomspace(n - tail_start, 1, tail_points)
+    
+    return np.unique(np.concatenate([body, tail, [n - 1]]).astype(int).clip(0, n - 1))
+
+def get_ecdf_trace(df, max_points=MAX_POINTS_PER_TRACE, divisor=1):
+    """
+    ECDF computed here as a step trace of at most about max_points points: the
+    series is sorted once and only the ranks from get_ecdf_positions are sent.
+    """
+    values = np.sort(np.asarray(drop_nans(df), dtype=float))
+    positions = get_ecdf_positions(len(values), max_points)
+    
+    return go.Scatter(x=values[positions] / divisor, y=(positions + 1) / len(values), mode="lines", line_shape="hv", name=df.name)
+
+def get_scatter_trace(df, mode):
+    """
+    WebGL scatter for long series, which the browser draws far faster than SVG.
+    """
+    scatter = go.Scattergl if len(df.index) >= WEBGL_MIN_POINTS else go.Scatter
+    
+    return scatter(x=df.index, y=df.values, mode=mode, name=df.name)
+
+def get_histogram_bins(dfs, bin_count=HISTOGRAM_BINS):
+    """
+    (start, end, bin_count) shared by the histograms of all dfs so their bars line up.
+    """
+    # ? fmin / fmax skip the NaNs without copying the series, an all-NaN series stays NaN
+    lows = [np.fmin.reduce(np.asarray(df, dtype=float)) for df in dfs if len(df.index) > 0]
+    highs = [np.fmax.reduce(np.asarray(df, dtype=float)) for df in dfs if len(df.index) > 0]
+    lows = [low for low in lows if not np.isnan(low)]
+    highs = [high for high in highs if not np.isnan(high)]
+    
+    if len(lows) == 0:
+        return (0.0, 1.0, bin_count)
+    
+    start, end = float(min(lows)), float(max(highs))
+    
+    # ? A single value still needs a bin with some width
+    if start == end:
+        start, end = start - 0.5, end + 0.5
+    
+    return (start, end, bin_count)
+
+def get_histogram_trace(df, bins, divisor=1):
+    """
+    Histogram counted over the full series with NumPy and sent as bars, so the
+    payload is one count per bin however many samples there are. bins are in
+    the series' unit, the bars are divided by divisor.
+    """
+    start, end, bin_count = bins
+    edges = np.linspace(start, end, bin_count + 1)
+    counts, _ = np.histogram(np.asarray(drop_nans(df), dtype=float), bins=edges)
+    
+    edges = edges / divisor
+    
+    return go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges), name=df.name)
+
+def get_trace(type, df, max_points=MAX_POINTS_PER_TRACE, bins=None, divisor=1):
+    """
+    Build the plotly trace for one series as a plain dict so it can be cached.
+    
+    Histograms need the bins from get_histogram_bins. The plotted values are
+    divided by divisor (e.g. μs to ms), the series itself is left as it is.
+    """
     if "box" in type:
-        fig = px.box(df, log_y=True) if not df.empty else ""
-    elif "bar" in type:
-        fig = px.bar(df, barmode="overlay")
+        trace = get_box_trace(df, divisor)
     elif "dot" in type:
-        fig = px.scatter(df)
+        trace = get_scatter_trace(downsample(df, max_points) / divisor, "markers")
     elif "line" in type:
-        fig = px.line(df)
+        trace = get_scatter_trace(downsample(df, max_points) / divisor, "lines")
     elif "histogram" in type:
-        fig = px.histogram(df, barmode="overlay")
+        trace = get_histogram_trace(df, bins or get_histogram_bins([df]), divisor)
     elif "cdf" in type:
+        trace = get_ecdf_trace(df, max_points, divisor)
         
-        color_list = px.colors.qualitative.Plotly * 10
-        rand_ints = sample(range(0, len(color_list)), len(dfs))
-        rand_colors = [color_list[x % len(color_list)] for x in rand_ints]
-        
-        fig = go.Figure()
-        
-        figs = []
-        
-        for i in range(len(dfs)):
-            df = dfs[i]
-            if df.isnull().any().any():
-                df = df.dropna()
-            figs.append( px.ecdf(df).update_traces(line_color=rand_colors[i]) )
-        
-        fig = go.Figure(data=functools.reduce(operator.add, [_.data for _ in figs]))
+    return trace.to_plotly_json()
 
-    fig.update_layout(xaxis_title=x_title, yaxis_title=y_title)
+def get_trace_budget(trace_count, max_points=MAX_POINTS_PER_TRACE):
+    """
+    Points each of trace_count traces may send so the whole figure stays within MAX_POINTS_PER_FIGURE.
+    """
+    return max(min(max_points, MAX_POINTS_PER_FIGURE // max(trace_count, 1)), 1)
+
+def get_figure(type, traces, x_title, y_title):
+    fig = go.Figure(data=traces)
+    
+    if "box" in type:
+        fig.update_yaxes(type="log")
+    elif "histogram" in type:
+        fig.update_layout(barmode="overlay", bargap=0)
+        fig.update_traces(opacity=0.6)
+    
+    fig.update_layout(xaxis_title=x_title, yaxis_title=y_title, legend_title="variable")
     
     return dcc.Graph(figure=fig)
 
-def get_transient_analysis(dfs, metric):
+def get_plot(type, dfs, x_title, y_title, max_points=MAX_POINTS_PER_TRACE):
+    """
+    Stats are always computed over the full series. Line and dot plots are fed by
+    min/max bucketing, CDFs by the ranks from get_ecdf_positions and histograms are binned here,
+    so the figure stays within MAX_POINTS_PER_FIGURE.
+    """
+    if "bar" in type:
+        fig = px.bar(pd.concat(dfs, axis=1), barmode="overlay")
+        fig.update_layout(xaxis_title=x_title, yaxis_title=y_title)
+        return dcc.Graph(figure=fig)
+    
+    bins = get_histogram_bins(dfs) if "histogram" in type else None
+    max_points = get_trace_budget(len(dfs), max_points)
+    
+    return get_figure(type, [get_trace(type, df, max_points, bins) for df in dfs], x_title, y_title)
+
+def get_batch_means_variances(df, min_batch_size=10, max_batch_size=100):
+    """
+    Variance of the non-overlapping batch means for every batch size in
+    [min_batch_size, max_batch_size].
+    
+    Every batch mean of every batch size comes from one cumulative sum of the
+    series so the whole curve costs a handful of NumPy operations. Samples that
+    don't fill a final batch are left out. Batch sizes with no full batch are dropped.
+    """
+    values = np.asarray(drop_nans(df), dtype=float)
+    
+    # ? Centre the data so the sum of squares below doesn't lose precision
+    values = values - values.mean() if len(values) > 0 else values
+    cumsum = np.concatenate([[0], np.cumsum(values)])
+    
+    batch_sizes = np.arange(min_batch_size, max_batch_size + 1)
+    batch_counts = len(values) // batch_sizes
+    batch_sizes = batch_sizes[batch_counts > 0]
+    batch_counts = batch_counts[batch_counts > 0]
+    
+    # ? One entry per batch of every batch size
+    group = np.repeat(np.arange(len(batch_sizes)), batch_counts)
+    sizes = batch_sizes[group]
+    group_starts = np.concatenate([[0], np.cumsum(batch_counts)[:-1]])
+    batch_i = np.arange(len(group)) - group_starts[group]
+    starts = batch_i * sizes
+    
+    means = (cumsum[starts + sizes] - cumsum[starts]) / sizes
+    
+    mean_of_means = np.bincount(group, weights=means, minlength=len(batch_sizes)) / batch_counts
+    mean_of_squares = np.bincount(group, weights=means ** 2, minlength=len(batch_sizes)) / batch_counts
+    variances = np.maximum(mean_of_squares - mean_of_means ** 2, 0)
+    
+    return batch_sizes, variances
+
+def get_transient_analysis(dfs, metric, min_batch_size=10, max_batch_size=100, divisor=1):
     
     containers = []
     
     for df in dfs:
         
-        # set initial batch size and maximum batch size
-        batch_size = 10
-        max_batch_size = 100
-
-        # initialize empty lists for storing batch means and variances
-        batch_means = []
-        batch_variances = []
-
-        # loop over batch sizes
-        while batch_size <= max_batch_size:
-            # split the dataframe into batches of equal size
-            batches = np.array_split(df, len(df) / batch_size)
-
-            # calculate the mean of each batch
-            means = [batch.mean() for batch in batches]
-
-            # calculate the variance of the batch means
-            variance = np.var(means)
-
-            # append the batch mean and variance to the respective lists
-            batch_means.append(means)
-            batch_variances.append(variance)
-
-            # increase the batch size
-            batch_size += 1
+        batch_sizes, batch_variances = get_batch_means_variances(df, min_batch_size, max_batch_size)
+        
+        # ? Variances scale with the square of the unit
+        batch_variances = batch_variances / divisor ** 2
     
         fig = go.Figure()
-        fig.add_trace(go.Scatter(y=batch_variances))
+        fig.add_trace(go.Scatter(x=batch_sizes, y=batch_variances))
         fig.update_layout(
             title="Batch Variation of Means",
             xaxis_title="Batch Size",
@@ -449,41 +1438,250 @@ def get_transient_analysis(dfs, metric):
     
     return output
 
-def get_comb_output(tests):
-    durations = []
-    datalens = []
-    pubs = []
-    subs = []
-    reliabilities = []
-    unicasts = []
-    durabilities = []
-    lat_counts = []
+def get_summary_files(tests, testdir):
+    """
+    (testname, summary file) of every selected test that has a summary.
+    """
+    summary_files = []
     
     for test in tests:
-        test = os.path.basename(test)
-        
-        test = test.split("_")
-        if len(test) >= 8:
-            durations.append(test[0])
-            datalens.append(test[1])
-            pubs.append(test[2])
-            subs.append(test[3])
-            reliabilities.append(test[4])
-            unicasts.append(test[5])
-            durabilities.append(test[6])
-            lat_counts.append(test[7])
+        summary_file = get_summary_path(testdir, test)
+        if not os.path.exists(summary_file):
+            console.print(f"Summmary file doesn't exist for {test}.", style="bold red")
+            continue
+        summary_files.append((test, summary_file))
+        
+    return summary_files
+
+def get_metric_section_output(metric, section, tests, testdir, steady_state=False):
+    summary_files = get_summary_files(tests, testdir)
+    
+    if len(summary_files) == 0:
+        return ""
+    
+    value_title, time_title, transient_title = METRIC_TITLES[metric]
+    
+    if section == "summary":
+        return generate_summary_table(
+            get_tests_summary_stats(summary_files, metric, steady_state),
+            get_tests_confidence_intervals(summary_files, metric, steady_state)
+        )
+    
+    if section == "transient":
+        return get_transient_analysis(get_metric_dfs(summary_files, metric, steady_state), transient_title, divisor=METRIC_COLUMNS[metric][1])
+    
+    # ? The sketches cover the whole run so they can't be used once the warm-up is dropped
+    if metric == "latency" and section == "cdf" and not steady_state:
+        sketches = {test: get_test_latency_sketch(testdir, test) for test, _ in summary_files}
+        
+        if all(sketch is not None for sketch in sketches.values()):
+            return get_latency_sketch_output(sketches, value_title)
+    
+    type = section.replace("plot", "")
+    
+    # ? All traces of a figure share its point budget and histograms share their bins
+    max_points = get_trace_budget(len(summary_files))
+    bins = get_histogram_bins(get_metric_dfs(summary_files, metric, steady_state)) if type == "histogram" else None
+    
+    traces = []
+    for i, (test, summary_file) in enumerate(summary_files):
+        report_progress(i, len(summary_files), f"Drawing {test}")
+        traces.append(get_test_trace(summary_file, metric, type, test, steady_state, max_points, bins))
+    
+    if type == "box":
+        return get_figure(type, traces, "Test", value_title)
+    elif type in ["dot", "line"]:
+        return get_figure(type, traces, time_title, value_title)
+    elif type == "histogram":
+        return get_figure(type, traces, value_title, "Number of Observations")
+    elif type == "cdf":
+        return get_figure(type, traces, value_title, "F(x)")
+
+def get_test_latency_sketch(testdir, test):
+    sketch_path = get_latency_sketch_path(testdir, test)
+    
+    if not os.path.exists(sketch_path):
+        return None
+    
+    return load_latency_sketch(sketch_path)
+
+def get_latency_sketch_output(sketches, value_title):
+    """
+    Latency CDFs and percentile table drawn from the tests' sketches (see process.py)
+    instead of their full series. Sketches are in μs and plotted in ms.
+    """
+    divisor = METRIC_COLUMNS["latency"][1]
+    
+    traces = []
+    for test, sketch in sketches.items():
+        x, y = get_sketch_cdf(sketch)
+        traces.append(go.Scatter(x=x / divisor, y=y, mode="lines", line_shape="hv", name=test).to_plotly_json())
+    
+    columns = dict(sketches)
+    if len(sketches) > 1:
+        columns["All Selected (merged)"] = merge_sketches(list(sketches.values()))
+    
+    quantiles = list(SKETCH_PERCENTILES.values())
+    percentiles = {name: get_sketch_quantiles(sketch, quantiles) / divisor for name, sketch in columns.items()}
+    
+    percentile_table = dbc.Table([
+        html.Thead(
+            html.Tr([html.Th("Percentile")] + [html.Th(name) for name in columns])
+        ),
+        html.Tbody(
+            [html.Tr([html.Td("Count")] + [html.Td("{0:,.0f}".format(sketch["count"])) for sketch in columns.values()])] +
+            [
+                html.Tr([html.Td(label)] + [html.Td("{0:,.3f}".format(percentiles[name][i])) for name in columns])
+                for i, label in enumerate(SKETCH_PERCENTILES)
+            ]
+        )
+    ], bordered=True, hover=True)
+    
+    return html.Div([
+        get_figure("cdf", traces, value_title, "F(x)"),
+        html.H5(f"{value_title} Percentiles"),
+        percentile_table
+    ])
+
+def get_timeline_correlations(timeline, column="latency_p99_us"):
+    """
+    Pearson correlation of column with every other series of the timeline,
+    strongest (positive or negative) first.
+    """
+    series = timeline.drop(columns=["second", "timestamp"]).apply(pd.to_numeric, errors="coerce")
+    
+    if column not in series.columns:
+        return pd.Series(dtype=float)
+    
+    # ? Constant series (e.g. no network errors) have no correlation with anything
+    others = series.drop(columns=[_ for _ in TIMELINE_EXCLUDED_CORRELATIONS if _ in series.columns])
+    others = others.loc[:, others.nunique() > 1]
+    
+    correlations = others.corrwith(series[column]).dropna()
+    
+    return correlations.reindex(correlations.abs().sort_values(ascending=False).index)
+
+def get_timeline_figure(timeline):
+    """
+    Latency, throughput, CPU and network usage of one test stacked on a shared
+    time axis so spikes in one can be matched with the others.
+    """
+    has_timestamps = timeline["timestamp"].notna().all()
+    x = timeline["timestamp"] if has_timestamps else timeline["second"]
+    divisor = METRIC_COLUMNS["latency"][1]
+    
+    fig = make_subplots(rows=len(TIMELINE_PANELS), cols=1, shared_xaxes=True, vertical_spacing=0.04)
+    
+    for row, (y_title, suffixes) in enumerate(TIMELINE_PANELS, start=1):
+        for suffix in suffixes:
+            for column in [_ for _ in timeline.columns if _.endswith(suffix)]:
+                y = timeline[column]
+                name = column
+                
+                if column.startswith("latency_"):
+                    y = y / divisor
+                # ? CPU usage is shown as the busy %, i.e. everything but idle
+                elif column.endswith("_cpu_idle"):
+                    y = 100 - y
+                    name = column.replace("_cpu_idle", "_cpu_busy")
+                
+                fig.add_trace(go.Scatter(x=x, y=y, mode="lines", name=name), row=row, col=1)
+        
+        fig.update_yaxes(title_text=y_title, row=row, col=1)
+    
+    fig.update_xaxes(title_text="Time" if has_timestamps else "Time (s)", row=len(TIMELINE_PANELS), col=1)
+    fig.update_layout(height=250 * len(TIMELINE_PANELS), hovermode="x unified")
+    
+    return fig
+
+def get_timeline_output(tests, testdir):
+    children = []
+    
+    for test, summary_file in get_summary_files(tests, testdir):
+        timeline = load_test_timeline(summary_file)
+        
+        if timeline is None:
+            children.append(html.P(f"{test} has no timeline, summarise it again with process.py to get one."))
+            continue
+        
+        correlations = get_timeline_correlations(timeline).head(TIMELINE_CORRELATIONS)
+        
+        children.append(html.Div([
+            html.H3(f"{test} Time-Aligned Overlay"),
+            dcc.Graph(figure=get_timeline_figure(timeline)),
+            html.H5("Series Most Correlated With Latency p99 (per second)"),
+            dbc.Table([
+                html.Thead(html.Tr([html.Th("Series"), html.Th("Correlation")])),
+                html.Tbody([
+                    html.Tr([html.Td(column), html.Td("{0:.2f}".format(correlation))])
+                    for column, correlation in correlations.items()
+                ])
+            ], bordered=True, hover=True)
+        ]))
+    
+    return html.Div(children)
+
+def get_samples_barchart_output(metric, tests, testdir):
+    dfs = []
+    
+    for test, summary_file in get_summary_files(tests, testdir):
+        summary_df = load_summary_columns_like(summary_file, lambda col: col.startswith("sub_") and ("total_samples_received" in col or "lost" in col))
+        
+        if metric == "total-samples-received":
+            dfs.append(get_total_samples_received_per_sub(summary_df).rename(test))
         else:
-            pprint(f"{test} has more than 8 variables in its name.")
+            dfs.append(get_lost_samples_received_per_sub(summary_df).rename(test))
+    
+    if len(dfs) == 0:
+        return ""
+    
+    return get_plot("bar", dfs, "sub_n", "# of samples")
+
+def get_system_usage_output(section, tests, testdir, vm=ALL_VMS):
+    children = []
+    vm = vm or ALL_VMS
+    
+    for test, summary_file in get_summary_files(tests, testdir):
+        if vm != ALL_VMS and vm not in set(load_test_sar_df(summary_file)["vm"].astype(str)):
+            children.append(html.P(f"{test} has no logs for {vm}."))
             continue
+        
+        system_figures = get_test_system_figures(summary_file, vm)
+        
+        if section == "cpu-usage":
+            children.append(html.Div([
+                html.H3(f"{test} CPU Usage Line Plots"),
+                dcc.Graph(figure=system_figures["cpu"])
+            ]))
+        elif section == "ram-usage":
+            children.append(html.Div([
+                html.H3(f"{test} RAM Usage Line Plots"),
+                dcc.Graph(figure=system_figures["mem"])
+            ]))
+        elif section == "network-usage":
+            children.append(html.Div([
+                html.H3(f"{test} Network Usage Line Plots"),
+                dcc.Graph(figure=system_figures["network_packets"]),
+                dcc.Graph(figure=system_figures["network_kbs"])
+            ]))
+    
+    return html.Div(children)
+
+def get_participant_allocation_section(tests, testdir):
+    participant_allocation_dfs = [{test: get_participant_allocation_df(load_summary(summary_file, ("pub_allocation_per_machine", "sub_allocation_per_machine")))} for test, summary_file in get_summary_files(tests, testdir)]
+    
+    return get_participant_allocation_output(participant_allocation_dfs)
 
-    durations = list(set(durations))
-    datalens = list(set(datalens))
-    pubs = list(set(pubs))
-    subs = list(set(subs))
-    reliabilities = list(set(reliabilities))
-    unicasts = list(set(unicasts))
-    durabilities = list(set(durabilities))
-    lat_counts = list(set(lat_counts))
+def get_comb_output(tests, settings_values):
+    """
+    settings_values holds the distinct values of each setting (see get_test_settings_values).
+    """
+    if len(settings_values) < 8:
+        if len(settings_values) > 0:
+            pprint(f"Expected at least 8 settings in the test names but found {len(settings_values)}.")
+        settings_values = settings_values + [[]] * (8 - len(settings_values))
+    
+    durations, datalens, pubs, subs, reliabilities, unicasts, durabilities, lat_counts = settings_values[:8]
 
     total_combs = len(durations) * len(datalens) * len(pubs) * len(subs) * len(reliabilities) * len(unicasts) * len(durabilities) * len(lat_counts)
 
@@ -664,30 +1862,20 @@ def get_total_samples_received_summary_table(tests, testdir, total_dfs, lost_dfs
     return html.Div([ summary_table_output, barchart_output ])
 
 def generate_setting_selection(testpath):
-    tests = [_.replace("_summary.csv", "") for _ in os.listdir(testpath)]
+    tests, _ = get_test_summaries(testpath)
     
     if len(tests) == 0:
         return ""
     
-    result = []
-    for item in tests:
-        parts = item.split('_')
-        if len(result) < len(parts):
-            for i in range(len(parts)):
-                result.append([parts[i]])
-        else:
-            for i in range(len(parts)):
-                result[i].append(parts[i])
-
-    for i in range(len(result)):
-        result[i] = list(set(result[i]))
+    result = get_test_settings_values(testpath)
 
     setting_dropdowns = dbc.Row([
         dbc.Col([
             dcc.Dropdown(
-                id='dropdown-{}'.format(i),
+                id={"type": "setting-dropdown", "index": i},
                 options=[{'label': val, 'value': val} for val in sorted(sublist)] + [{'label': 'Vary', 'value': 'vary'}],
-                value=sublist[0],
+                value=[sublist[0]],
+                multi=True,
                 style={"margin-bottom": "1vh", "width": "100%"}
             )
         ]) for i, sublist in enumerate(result)
@@ -747,17 +1935,57 @@ def get_participant_allocation_output(dfs):
     return html.Div(children=children)
         
 def get_truncation_index(df):
-    # ? Ignore the first l observations
-    for l in range(len(df) - 1):
-        # ? Calculate the min and max of the remaining observations
-        min_val = df.iloc[l+1:].min()
-        max_val = df.iloc[l+1:].max()
-        # ? Check if the l+1 observation is neither the minimum nor the maximum
-        if (df.iloc[l+1] != min_val).any() and (df.iloc[l+1] != max_val).any():
-            # ? Return the value of l at that point
-            return l
-        
-    return len(df.index)
+    """
+    Smallest l such that observation l+1 is neither the min nor the max of the
+    observations after it, found in O(n) with suffix min/max arrays.
+    """
+    values = np.asarray(df, dtype=float)
+    
+    if len(values) < 2:
+        return len(values)
+    
+    # ? suffix_min[i] / suffix_max[i] are the min / max of values[i:]
+    suffix_min = np.minimum.accumulate(values[::-1])[::-1]
+    suffix_max = np.maximum.accumulate(values[::-1])[::-1]
+    
+    is_extreme = (values == suffix_min) | (values == suffix_max)
+    candidates = np.flatnonzero(~is_extreme[1:])
+    
+    if len(candidates) == 0:
+        return len(values)
+    
+    return int(candidates[0])
+
+def get_mser_truncation_index(df, batch_size=5):
+    """
+    Warm-up length chosen by MSER-5 (Marginal Standard Error Rule on batches of 5).
+    
+    Truncating d batches leaves z[d:] and scores it with sum((z - mean)^2) / (k - d)^2.
+    Running sums from the end of the series give every score in O(n). Only the
+    first half of the run is considered as warm-up, as is usual for MSER.
+    """
+    values = np.asarray(drop_nans(df) if isinstance(df, pd.Series) else df, dtype=float)
+    
+    batch_count = len(values) // batch_size
+    
+    if batch_count < 2:
+        return 0
+    
+    batch_means = values[:batch_count * batch_size].reshape(batch_count, batch_size).mean(axis=1)
+    batch_means = batch_means - batch_means.mean()
+    
+    suffix_sum = np.cumsum(batch_means[::-1])[::-1]
+    suffix_sum_squares = np.cumsum((batch_means ** 2)[::-1])[::-1]
+    remaining = batch_count - np.arange(batch_count)
+    
+    mser = (suffix_sum_squares - suffix_sum ** 2 / remaining) / remaining ** 2
+    
+    d = int(np.argmin(mser[:batch_count // 2 + 1]))
+    
+    return d * batch_size
+
+def get_steady_state_df(df, batch_size=5):
+    return df.iloc[get_mser_truncation_index(df, batch_size):]
 
 def custom_key(s):
     # value = s.split('_')[1]
@@ -0,0 +1,153 @@
+import numpy as np
+
+from scipy import stats
+
+# ? The series is split into this many non-overlapping batches (and bootstrap blocks)
+BATCH_COUNT = 30
+
+BOOTSTRAP_REPLICATES = 1000
+
+# ? Quantile that gets an interval next to the mean
+INTERVAL_QUANTILE = .99
+
+# ? Shorter batches don't have a tail to take the quantile of, their p99 is just their max
+MIN_QUANTILE_BATCH_SIZE = int(np.ceil(1 / (1 - INTERVAL_QUANTILE)))
+
+CONFIDENCE = .95
+
+# ? Probabilities of the bin edges the bootstrapped quantiles are read from, denser in the tail
+BOOTSTRAP_EDGE_PROBABILITIES = np.unique(np.concatenate([np.linspace(0, .98, 981), np.linspace(.98, 1, 2001)]))
+
+def get_batches(values, batch_count=BATCH_COUNT):
+    """
+    values as batch_count equal, non-overlapping, consecutive batches (one per
+    row) or None if there are too few values. The remainder is dropped from the
+    start of the series, where the warm-up is.
+    """
+    batch_size = len(values) // batch_count
+    
+    if batch_size < 2:
+        return None
+    
+    return values[len(values) - batch_size * batch_count:].reshape(batch_count, batch_size)
+
+def get_t_interval(estimates, confidence=CONFIDENCE, centre=None):
+    """
+    Student t interval from the spread of the per-batch estimates, around their
+    mean unless another centre is given.
+    """
+    half_width = stats.t.ppf((1 + confidence) / 2, len(estimates) - 1) * estimates.std(ddof=1) / np.sqrt(len(estimates))
+    
+    if centre is None:
+        centre = estimates.mean()
+    
+    return (centre - half_width, centre + half_width)
+
+def get_batch_means_intervals(values, batches):
+    """
+    Batch means: with batches long enough, the batch estimates are close to
+    independent even when the samples are strongly autocorrelated, so a t
+    interval over them is honest where one over the raw samples is far too narrow.
+    
+    A quantile of a batch is biased (the mean of the batch p99s sits below the
+    series' p99), so the p99 interval is centred on the whole series' p99 and
+    only its width comes from the batches. Batches shorter than
+    MIN_QUANTILE_BATCH_SIZE get a NaN p99 interval.
+    """
+    if batches.shape[1] < MIN_QUANTILE_BATCH_SIZE:
+        p99 = (np.nan, np.nan)
+    else:
+        p99 = get_t_interval(np.quantile(batches, INTERVAL_QUANTILE, axis=1), centre=np.quantile(values, INTERVAL_QUANTILE))
+    
+    return {
+        "mean": get_t_interval(batches.mean(axis=1)),
+        "p99": p99
+    }
+
+def get_block_counts(block_count, replicates, rng):
+    """
+    How many times each block is drawn in each replicate, (replicates, block_count).
+    """
+    picks = rng.integers(0, block_count, size=(replicates, block_count))
+    picks += block_count * np.arange(replicates)[:, None]
+    
+    return np.bincount(picks.ravel(), minlength=replicates * block_count).reshape(replicates, block_count)
+
+def get_histogram_quantiles(histograms, edges, quantile):
+    """
+    quantile of each row of histograms, interpolated linearly inside its bin.
+    """
+    cumulative = np.cumsum(histograms, axis=1)
+    targets = quantile * cumulative[:, -1]
+    
+    bins = np.minimum((cumulative < targets[:, None]).sum(axis=1), histograms.shape[1] - 1)
+    rows = np.arange(len(histograms))
+    
+    before = np.where(bins > 0, cumulative[rows, np.maximum(bins - 1, 0)], 0)
+    in_bin = np.maximum(histograms[rows, bins], 1)
+    
+    return edges[bins] + (targets - before) / in_bin * (edges[bins + 1] - edges[bins])
+
+def get_block_bootstrap_intervals(values, batches, replicates=BOOTSTRAP_REPLICATES, seed=0):
+    """
+    Non-overlapping block bootstrap: whole batches are resampled with replacement,
+    which keeps the autocorrelation inside each block.
+    
+    All replicates are computed at once. A replicate's mean comes from the block
+    means it draws. Its quantile comes from adding up the histograms of those blocks
+    (bins from the whole series' quantiles), so no replicate ever materialises the
+    resampled series.
+    """
+    rng = np.random.default_rng(seed)
+    
+    counts = get_block_counts(len(batches), replicates, rng)
+    
+    mean_replicates = counts @ batches.mean(axis=1) / len(batches)
+    
+    edges = np.unique(np.quantile(values, BOOTSTRAP_EDGE_PROBABILITIES))
+    if len(edges) < 2:
+        edges = np.array([edges[0], edges[0]])
+    
+    bin_count = len(edges) - 1
+    bins = np.clip(np.searchsorted(edges, batches, side="right") - 1, 0, max(bin_count - 1, 0))
+    bins += bin_count * np.arange(len(batches))[:, None]
+    histograms = np.bincount(bins.ravel(), minlength=len(batches) * bin_count).reshape(len(batches), bin_count)
+    
+    quantile_replicates = get_histogram_quantiles(counts @ histograms, edges, INTERVAL_QUANTILE)
+    
+    tails = [(1 - CONFIDENCE) / 2, (1 + CONFIDENCE) / 2]
+    
+    return {
+        "mean": tuple(np.quantile(mean_replicates, tails)),
+        "p99": tuple(np.quantile(quantile_replicates, tails))
+    }
+
+def get_confidence_intervals(values, replicates=BOOTSTRAP_REPLICATES, seed=0, divisor=1):
+    """
+    95% intervals of the mean and p99 of one series, by batch means and by block
+    bootstrap, as {"batch_means": {"mean": (low, high), "p99": ...}, "bootstrap": {...}}.
+    
+    The bounds are divided by divisor (e.g. μs to ms), every interval scales
+    with the series so values never have to be converted as a whole. Series too
+    short to split into batches get NaN intervals.
+    """
+    values = np.asarray(values, dtype=float)
+    nans = np.isnan(values)
+    if nans.any():
+        values = values[~nans]
+    
+    batches = get_batches(values)
+    
+    if batches is None:
+        empty = {"mean": (np.nan, np.nan), "p99": (np.nan, np.nan)}
+        return {"batch_means": dict(empty), "bootstrap": dict(empty)}
+    
+    intervals = {
+        "batch_means": get_batch_means_intervals(values, batches),
+        "bootstrap": get_block_bootstrap_intervals(values, batches, replicates, seed)
+    }
+    
+    return {
+        method: {stat: (low / divisor, high / divisor) for stat, (low, high) in bounds.items()}
+        for method, bounds in intervals.items()
+    }
@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import uuid
+import tempfile
+import functools
+import multiprocessing
+
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from atomic import write_atomically
+
+# ? Worker processes the background jobs run in
+JOB_WORKERS = int(os.environ.get("PTST_JOBS", os.cpu_count() or 1))
+
+# ? Each job has a progress file and, once cancelled, a cancel file in here
+JOB_DIR = os.path.join(tempfile.gettempdir(), "ptst-jobs")
+
+# ? Seconds a finished job's result is kept for if nobody collects it
+JOB_RESULT_TTL = 600
+
+# ? Jobs submitted by this process, by job id
+jobs = {}
+
+# ? Progress file of the job running in this (worker) process
+current_job = {}
+
+@functools.lru_cache(maxsize=1)
+def get_job_executor():
+    # ? The pool is started from inside the web server's threads, which forking isn't safe from
+    return ProcessPoolExecutor(max_workers=JOB_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+def in_job_worker():
+    return multiprocessing.parent_process() is not None
+
+def get_job_paths(job_id):
+    job_path = os.path.join(JOB_DIR, job_id)
+    
+    return f"{job_path}.progress", f"{job_path}.cancel"
+
+def run_job(job_id, func, args):
+    """
+    Worker side of a job: runs func with the job set as the current one so
+    that report_progress knows where to write to.
+    """
+    current_job["paths"] = get_job_paths(job_id)
+    
+    try:
+        # ? Jobs cancelled while they were waiting for a worker stop here
+        report_progress(0, 0)
+        return func(*args)
+    finally:
+        current_job.clear()
+
+def report_progress(done, total, message=""):
+    """
+    Record how far along the current job is and stop it if it has been
+    cancelled. Does nothing outside of jobs, so the work can call it regardless.
+    """
+    if "paths" not in current_job:
+        return
+    
+    progress_path, cancel_path = current_job["paths"]
+    
+    if os.path.exists(cancel_path):
+        raise CancelledError()
+    
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump({"done": done, "total": total, "message": message}, f)
+    
+    write_atomically(progress_path, write)
+
+def remove_job_files(job_id):
+    for path in get_job_paths(job_id):
+        if os.path.exists(path):
+            os.remove(path)
+
+def on_job_done(job_id, future):
+    job = jobs.get(job_id)
+    if job is not None:
+        job["finished"] = time.time()
+    
+    remove_job_files(job_id)
+
+def submit_job(func, *args):
+    """
+    Run func(*args) in the job pool and return the job's id. func and args must
+    be picklable, so func has to be a module level function (or a partial of one).
+    """
+    # ? Results of jobs nobody came back for are dropped after a while
+    for job_id, job in list(jobs.items()):
+        if "finished" in job and time.time() - job["finished"] > JOB_RESULT_TTL:
+            jobs.pop(job_id, None)
+    
+    os.makedirs(JOB_DIR, exist_ok=True)
+    
+    job_id = uuid.uuid4().hex
+    
+    try:
+        future = get_job_executor().submit(run_job, job_id, func, args)
+    except BrokenProcessPool:
+        # ? A worker died (e.g. ran out of memory), which takes the whole pool down with it
+        get_job_executor.cache_clear()
+        future = get_job_executor().submit(run_job, job_id, func, args)
+    jobs[job_id] = {"future": future, "submitted": time.time()}
+    future.add_done_callback(functools.partial(on_job_done, job_id))
+    
+    return job_id
+
+def submit_job_group(tasks, join):
+    """
+    Run every (func, args) of tasks as a job of its own, so they're spread over
+    the workers, and return an id that stands for all of them. Once they're
+    all done the group's result is join(results), with the results in the
+    order of tasks. join runs in this process so it doesn't have to be picklable.
+    """
+    group_id = uuid.uuid4().hex
+    
+    jobs[group_id] = {
+        "group": [submit_job(func, *args) for func, args in tasks],
+        "results": {},
+        "join": join,
+        "submitted": time.time()
+    }
+    
+    return group_id
+
+def cancel_job(job_id):
+    """
+    Jobs that haven't started are dropped from the queue. Running ones are
+    flagged and stop at their next report_progress. Cancelling a group cancels
+    all of its jobs.
+    """
+    job = jobs.pop(job_id, None) if job_id is not None else None
+    
+    if job is None:
+        return
+    
+    if "group" in job:
+        for member_id in job["group"]:
+            cancel_job(member_id)
+        return
+    
+    future = job["future"]
+    
+    if not future.cancel() and not future.done():
+        _, cancel_path = get_job_paths(job_id)
+        open(cancel_path, "w").close()
+
+def get_job_status(job_id):
+    """
+    {"state": "queued" | "running" | "done" | "failed" | "missing", ...} of a job.
+    
+    Running jobs come with their last reported done, total and message, done
+    jobs with their result and failed ones with their error. A job is forgotten
+    once its result or error has been handed out.
+    """
+    job = jobs.get(job_id) if job_id is not None else None
+    
+    if job is None:
+        return {"state": "missing"}
+    
+    if "group" in job:
+        return get_group_status(job_id, job)
+    
+    future = job["future"]
+    
+    if not future.done():
+        progress_path, _ = get_job_paths(job_id)
+        
+        # ? The progress file is written as the job starts
+        if not os.path.exists(progress_path):
+            return {"state": "queued", "done": 0, "total": 0, "message": ""}
+        
+        try:
+            with open(progress_path, "r") as f:
+                progress = json.load(f)
+        except (OSError, ValueError):
+            progress = {"done": 0, "total": 0, "message": ""}
+        
+        return dict(progress, state="running")
+    
+    jobs.pop(job_id, None)
+    
+    if future.cancelled():
+        return {"state": "missing"}
+    
+    error = future.exception()
+    if error is not None:
+        return {"state": "failed", "error": error}
+    
+    return {"state": "done", "result": future.result()}
+
+def get_group_status(group_id, group):
+    """
+    Status of a job group: running until all of its jobs are done, with how
+    many are, then done with the joined result. The whole group fails or goes
+    missing as soon as one of its jobs does.
+    """
+    for member_id in group["group"]:
+        if member_id in group["results"]:
+            continue
+        
+        status = get_job_status(member_id)
+        
+        if status["state"] == "done":
+            group["results"][member_id] = status["result"]
+        elif status["state"] in ["failed", "missing"]:
+            cancel_job(group_id)
+            return status
+    
+    done, total = len(group["results"]), len(group["group"])
+    
+    if done < total:
+        return {"state": "running", "done": done, "total": total, "message": "Waiting for its jobs"}
+    
+    jobs.pop(group_id, None)
+    
+    try:
+        return {"state": "done", "result": group["join"]([group["results"][member_id] for member_id in group["group"]])}
+    except Exception as error:
+        return {"state": "failed", "error": error}
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+# ? Rows parsed at a time, ~16 MB of float64 latencies per chunk
+LATENCY_CHUNKSIZE = 1_000_000
+
+# ? perftest prints 2 "Waiting..." / "Publishing..." lines before the csv header
+PERFTEST_HEADER_ROW = 2
+
+# ? Interval rows at the end of a sub csv that are averages produced by perftest rather than samples
+SUB_AVERAGE_ROWS = 2
+
+def get_latency_column_index(pubfile):
+    with open(pubfile, "r", errors="replace") as f:
+        for _ in range(PERFTEST_HEADER_ROW):
+            f.readline()
+        header = [_.strip() for _ in f.readline().split(",")]
+    
+    return [i for i, col in enumerate(header) if "latency" in col.lower()][0]
+
+def iter_latency_chunks(pubfile, chunksize=LATENCY_CHUNKSIZE):
+    """
+    Yield the latency column of a perftest pub csv as float arrays of up to
+    chunksize values, so the file is never held in memory all at once.
+    
+    Only the first column and the latency column are parsed. Reading stops at
+    the first row whose first field isn't a number, which is where perftest's
+    "Latency Summary:" footer starts.
+    """
+    lat_index = get_latency_column_index(pubfile)
+    
+    reader = pd.read_csv(
+        pubfile,
+        on_bad_lines="skip",
+        skiprows=PERFTEST_HEADER_ROW,
+        skipinitialspace=True,
+        usecols=sorted({0, lat_index}),
+        chunksize=chunksize
+    )
+    
+    with reader:
+        for chunk in reader:
+            first_col = pd.to_numeric(chunk.iloc[:, 0], errors="coerce")
+            footer_rows = first_col.isna().values
+            
+            if footer_rows.any():
+                chunk = chunk.iloc[:footer_rows.argmax()]
+            
+            yield pd.to_numeric(chunk.iloc[:, -1], errors="coerce").to_numpy(dtype=float)
+            
+            if footer_rows.any():
+                break
+
+def read_latencies(pubfile, chunksize=LATENCY_CHUNKSIZE, on_chunk=None):
+    """
+    All latencies of a perftest pub csv as one float array, read chunk by chunk.
+    
+    on_chunk is called with every chunk as it's read, e.g. to feed a sketch
+    without going over the file a second time.
+    """
+    chunks = []
+    
+    for latencies in iter_latency_chunks(pubfile, chunksize):
+        if on_chunk is not None:
+            on_chunk(latencies)
+        chunks.append(latencies)
+    
+    return np.concatenate(chunks) if chunks else np.array([], dtype=float)
+
+def read_sub_csv(sub_file):
+    """
+    Parse a perftest subscriber csv in one pass and return its interval rows.
+    
+    The first 2 lines are perftest's "Waiting for..." messages and the file
+    ends with a "Throughput Summary:" block. The footer is found as the first
+    row whose first field isn't a number instead of relying on skipfooter, so
+    the fast C engine can be used. The last SUB_AVERAGE_ROWS interval rows
+    are dropped too.
+    """
+    df = pd.read_csv(sub_file, on_bad_lines="skip", skiprows=PERFTEST_HEADER_ROW, skipinitialspace=True)
+    
+    # ? Everything from the first non-numeric row onwards is perftest's summary
+    first_col = pd.to_numeric(df.iloc[:, 0], errors="coerce")
+    footer_rows = first_col.isna().values
+    if footer_rows.any():
+        df = df.iloc[:footer_rows.argmax()]
+    
+    # ? Take off the last numbers because they're averages produced by perftest
+    df = df.iloc[:-SUB_AVERAGE_ROWS]
+    
+    df = df.apply(pd.to_numeric, errors="coerce")
+    
+    return df.reset_index(drop=True)
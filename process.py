@@ -1,37 +1,33 @@
+import hashlib
 import json
 import os
+import numpy as np
 import pandas as pd
 import shutil
 import sys
 
+from atomic import write_atomically
+from campaign import get_aggregates_path, get_latency_array_path, get_latency_sketch_path, get_sar_path, get_test_aggregates, get_timeline_path, load_latency_array, update_campaign_index, write_latency_array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from perftest import LATENCY_CHUNKSIZE, iter_latency_chunks, read_sub_csv
+from sar import get_sar_series, read_sar_logs, save_sar_df
+from sketch import add_to_sketch, new_sketch, save_sketch
+from timeline import get_latency_count_setting, get_timeline, save_timeline
 from pprint import pprint
 from rich.console import Console
 from rich.progress import track
+from rich.table import Table
 
-console = Console()
-
-args = sys.argv[1:]
-
-if len(args) < 3:
-    console.print(f"Expected at least 3 args but found {len(args)}. Refer to the readme for help.", style="bold red")
-    sys.exit()
-
-raw_dir = args[0]
-usable_dir = args[1]
-summaries_dir = args[2]
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
 
-console.print(f"Working on {os.path.basename(raw_dir)}...\n\n", style="bold white")
-
-if not os.path.exists(raw_dir):
-    console.print(f"The path {raw_dir} doesn't exist.", style="bold red")
-    sys.exit()
+console = Console()
 
-if "debug" in args:
-    try:
-        shutil.rmtree(usable_dir)
-        shutil.rmtree(summaries_dir)
-    except FileNotFoundError as e:
-        None
+# ? How usable tests are made available in usable_dir, "none" summarises them straight from raw_dir
+LINK_MODES = ["copy", "hardlink", "symlink", "none"]
 
 def get_expected_csv_count_from_testname(testname):
     split = testname.split("_")
@@ -49,65 +45,228 @@ def get_actual_csv_count(testdir):
     
     return len(csv_files)
 
-def get_latencies(pubfile):
+def get_latencies(pubfile, sketch, array_path):
+    """
+    Latency column of pubfile (in μs) memory-mapped from the .npy file at
+    array_path. Every chunk is also added to sketch.
+    
+    pubfile is streamed into the .npy chunk by chunk, so the latencies are never
+    all in memory. When the .npy is newer than pubfile it's used as it is.
+    """
+    if os.path.exists(array_path) and os.path.getmtime(array_path) >= os.path.getmtime(pubfile):
+        try:
+            latencies = load_latency_array(array_path)
+            
+            for i in range(0, len(latencies), LATENCY_CHUNKSIZE):
+                add_to_sketch(sketch, latencies[i:i + LATENCY_CHUNKSIZE])
+            
+            return latencies
+        except Exception as e:
+            console.print(f"Ignoring unreadable latency cache {array_path}: {e}", style="bold red")
+    
+    def sketched_chunks():
+        for latencies in iter_latency_chunks(pubfile):
+            add_to_sketch(sketch, latencies)
+            yield latencies
+    
     try:
-        df = pd.read_csv(pubfile, on_bad_lines="skip", skiprows=2, skipfooter=5, engine="python")
+        write_latency_array(array_path, sketched_chunks())
     except Exception as e:
         console.print(f"Error looking at {pubfile}:", style="bold red")
         console.print(e, style="bold red")
         return
     
-    try:
-        lat_header = [_ for _ in df.columns if "latency" in _.lower()][0]
-        df = df[lat_header]
-    except Exception as e:
-        print(e)
-        return
-
-    return df
-
-def get_metric_per_sub(sub_file, metric):
-    df = pd.read_csv(sub_file, on_bad_lines='skip', skiprows=2, skipfooter=3, engine='python')
-    sub_head = [x for x in df.columns if metric in x.lower()][0]
-    df = df[sub_head]
-    df.rename(os.path.basename(sub_file).replace(".csv", ""), inplace=True)
-    # ? Take off the last number because its an average produced by perftest
-    df = df[:-2]
-    
-    return df
+    return load_latency_array(array_path)
 
-def get_total_sub_metric(sub_files, metric):
-    sub_dfs = []
+def get_sub_dfs(sub_files):
+    sub_dfs = {}
     
     for file in sub_files:
         try:
-            df = pd.read_csv(file, on_bad_lines="skip", skiprows=2, skipfooter=3, engine="python")
+            sub_dfs[file] = read_sub_csv(file)
         except Exception as e:
             console.print(f"Error when getting data from {file}:", style="bold red")
             console.print(f"\t{e}", style="bold red")
             continue
-        sub_head = [x for x in df.columns if metric in x.lower()][0]
-        df = df[sub_head]
-        df.rename(os.path.basename(file).replace(".csv", ""), inplace=True)
-        sub_dfs.append(df)
         
-    if sub_dfs:
-        sub_df = pd.concat(sub_dfs, axis=1)
+    return sub_dfs
+
+def get_metric_per_sub(sub_df, metric):
+    sub_head = [x for x in sub_df.columns if metric in x.lower()][0]
+    
+    return sub_df[sub_head]
+
+def get_total_sub_metric(sub_dfs, metric):
+    if not sub_dfs:
+        console.print(f"Couldn't get any data from {list(sub_dfs)}.", style="bold red")
+        return pd.Series(dtype=float)
     
-        # ? Add up all columns to create total column
-        sub_df["total_" + metric] = sub_df[list(sub_df.columns)].sum(axis=1)
+    sub_df = pd.concat([get_metric_per_sub(df, metric).rename(file) for file, df in sub_dfs.items()], axis=1)
+    
+    # ? Add up all columns to create total column
+    total = sub_df.sum(axis=1, min_count=1)
+    
+    # ? The totals have always left out one more row than the per-sub columns
+    return total[:-1]
+
+def get_summary_paths(test, summaries_dir):
+    testname = os.path.basename(test)
+    
+    return {
+        "csv": os.path.join(summaries_dir, f"{testname}_summary.csv"),
+        "parquet": os.path.join(summaries_dir, f"{testname}_summary.parquet"),
+        "aggregates": get_aggregates_path(summaries_dir, testname),
+        "latency_sketch": get_latency_sketch_path(summaries_dir, testname),
+        "latency_array": get_latency_array_path(summaries_dir, testname),
+        "sar": get_sar_path(summaries_dir, testname),
+        "timeline": get_timeline_path(summaries_dir, testname)
+    }
+
+def get_summary_chunks(latencies, test_df, chunksize=LATENCY_CHUNKSIZE):
+    """
+    The summary's rows, chunksize at a time: the latency_us column followed by
+    the (much shorter) columns of test_df, padded with NaN like pd.concat would.
+    """
+    row_count = max(len(latencies), len(test_df))
+    
+    for start in range(0, max(row_count, 1), chunksize):
+        rows = pd.RangeIndex(start, min(start + chunksize, row_count))
         
-        # ? Take off the last number because its an average produced by perftest
-        sub_df = sub_df[:-2]
+        values = np.full(len(rows), np.nan)
+        latency_chunk = latencies[start:rows.stop]
+        values[:len(latency_chunk)] = latency_chunk
         
-        return sub_df["total_" + metric][:-1]
-    else:
-        console.print(f"Couldn't get any data from {sub_files}.", style="bold red")
+        chunk = test_df.reindex(rows)
+        chunk.insert(0, "latency_us", values)
+        
+        yield chunk
 
-def test_summary_exists(test, summaries_dir):
-    testname = os.path.basename(test)
-    summary_path = os.path.join(summaries_dir, f"{testname}_summary.csv")
-    return os.path.exists(summary_path)
+def write_summary_csv(path, latencies, test_df):
+    with open(path, "w", newline="") as f:
+        for i, chunk in enumerate(get_summary_chunks(latencies, test_df)):
+            # ? Replace NaN with ""
+            chunk.to_csv(f, sep=",", header=i == 0, na_rep="")
+
+def write_summary_parquet(path, latencies, test_df):
+    """
+    Typed copy of the summary (float64 with nulls), one row group per chunk.
+    """
+    test_df = test_df.apply(pd.to_numeric, errors="coerce").astype("float64")
+    writer = None
+    
+    try:
+        for chunk in get_summary_chunks(latencies, test_df):
+            table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+            
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+def hash_file(path):
+    sha1 = hashlib.sha1()
+    
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha1.update(block)
+            
+    return sha1.hexdigest()
+
+def get_input_fingerprint(test_dir):
+    """
+    {relative path: [size, mtime_ns]} of every file in the test's folder.
+    """
+    fingerprint = {}
+    
+    for root, dirs, files in os.walk(test_dir):
+        for file in files:
+            path = os.path.join(root, file)
+            stat = os.stat(path)
+            fingerprint[os.path.relpath(path, test_dir)] = [stat.st_size, stat.st_mtime_ns]
+            
+    return fingerprint
+
+def link_or_copy(src, dest):
+    """
+    Hard link src to dest, falling back to a copy across filesystems.
+    """
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+        
+    return dest
+
+def link_test(src, dest, link_mode):
+    """
+    Make the test at src available at dest without duplicating bytes unless
+    link_mode is "copy".
+    """
+    # ? A symlink from an earlier run resolves to src itself, it's replaced rather than taken for src
+    if os.path.islink(dest):
+        os.unlink(dest)
+    
+    # ? usable_dir can point at raw_dir itself, the test is already where it needs to be
+    if os.path.join(os.path.realpath(os.path.dirname(dest)), os.path.basename(dest)) == os.path.realpath(src):
+        return
+    
+    # ? Start from a clean destination in case the test changed since it was last linked
+    if os.path.exists(dest):
+        shutil.rmtree(dest)
+    
+    if link_mode == "copy":
+        shutil.copytree(src, dest)
+    elif link_mode == "hardlink":
+        shutil.copytree(src, dest, copy_function=link_or_copy)
+    elif link_mode == "symlink":
+        os.symlink(os.path.abspath(src), dest, target_is_directory=True)
+
+def get_manifest_path(summaries_dir):
+    return os.path.join(summaries_dir, "manifest.jsonl")
+
+def load_manifest(summaries_dir):
+    """
+    Latest manifest record of each test. The manifest is append-only JSON lines so
+    later records replace earlier ones and a truncated last line is ignored.
+    """
+    manifest = {}
+    manifest_path = get_manifest_path(summaries_dir)
+    
+    if not os.path.exists(manifest_path):
+        return manifest
+    
+    with open(manifest_path, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            manifest[record["test"]] = record
+            
+    return manifest
+
+def append_manifest_record(summaries_dir, record):
+    with open(get_manifest_path(summaries_dir), "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+def test_is_up_to_date(record, fingerprint, summaries_dir):
+    """
+    A test is skipped when it was summarised successfully from the same inputs
+    and its outputs are still there.
+    """
+    if record is None or record["status"] != "done":
+        return False
+    
+    if record["inputs"] != fingerprint:
+        return False
+    
+    return all(os.path.exists(os.path.join(summaries_dir, output)) for output in record["outputs"])
 
 def get_participant_allocation_per_machine(type, test):
     config = os.path.join(test, 'config.json')
@@ -128,164 +287,53 @@ def get_participant_allocation_per_machine(type, test):
         
     return allocation_list
 
-"""
-1. Find usable tests.
-2. Copy usable tests over to usable_dir.
-3. Summarise tests in usable_dir.
-"""
-
-report = []
-
-# ? 1. Find usable tests.
-test_dirs = [f.path for f in os.scandir(raw_dir) if f.is_dir()]
-
-usable_test_dirs = []
-
-for test_dir in test_dirs:
-    expected_csv_count = get_expected_csv_count_from_testname(os.path.basename(test_dir))
-    actual_csv_count = get_actual_csv_count(test_dir)
+def summarise_test(test, summaries_dir):
+    """
+    Summarise the logs, pub and sub csv files of one test into <test>_summary.csv.
     
-    if expected_csv_count == actual_csv_count:
-        usable_test_dirs.append(test_dir)
-    else:
-        report.append({
-            "test": os.path.basename(test_dir),
-            "issue": f"Expected {expected_csv_count} csv files and found {actual_csv_count} instead."
-        })
-
-usable_percentage = int(len(usable_test_dirs) / len(test_dirs) * 100)
-
-# ? 2. Copy usable tests over to usable_dir.
-for i in track(range(len(usable_test_dirs)), description=f"Copying over {len(usable_test_dirs)} usable tests out of {len(test_dirs)} ({usable_percentage}%) total tests...\n"):
-    usable_test_dir = usable_test_dirs[i]
-    src = usable_test_dir
-    dest = os.path.join(usable_dir, os.path.basename(usable_test_dir))
+    If pyarrow is installed a typed <test>_summary.parquet is written alongside it.
     
-    try:
-        if not os.path.exists(dest):
-            os.makedirs(dest)
-            shutil.copytree(src, dest, dirs_exist_ok=True)
-    except FileExistsError as e:
-        continue
-
-# ? 3. Summarise tests in usable_dir.
-if not os.path.exists(summaries_dir):
-    os.makedirs(summaries_dir)
+    Returns None on success or a description of why the test couldn't be summarised.
+    """
+    log_dir = os.path.join(test, "logs")
 
-usable_tests = [f.path for f in os.scandir(usable_dir) if f.is_dir()]
+    # ? CPU, RAM and network usage of every VM, see SAR_METRICS for the columns kept
+    sar_df = read_sar_logs(log_dir)
+    log_cols = get_sar_series(sar_df)
 
-for i in track( range( len(usable_tests) ), description="Summarising tests...", update_period=1 ):
-    test = usable_tests[i]
-    
-    if test_summary_exists(test, summaries_dir):
-        continue
-    
-    log_dir = os.path.join(test, "logs")
-    
-    log_files = os.listdir(log_dir)
-    logs = [os.path.join(log_dir, file) for file in log_files if '_cpu.log' in file or '_mem.log' in file or '_dev.log' in file or '_edev.log' in file]
-    logs = sorted(logs)
-    
-    """
-    CPU:
-    - %user
-    - %system
-    - %iowait
-    - %idle
-    RAM:
-    - kbmemfree
-    - kbmemused
-    - %memused
-    Network:
-    - DEV
-        - rxpck/s
-        - txpck/s
-        - rxkB/s
-        - txkB/s
-        - rxmcst/s
-    - EDEV
-        - rxerr/s
-        - txerr/s
-        - coll/s
-    """
-    
-    log_cols = []
-    
-    for log in logs:
-        df = pd.read_csv(log, skiprows=1, delim_whitespace=True)
-        
-        log_name = os.path.basename(log).replace(".log", "")
-        
-        if "_cpu" in log:
-            user_df = pd.Series(df['%user']).rename(f"{log_name}_user").dropna()
-            system_df = pd.Series(df['%system']).rename(f"{log_name}_system").dropna()
-            iowait_df = pd.Series(df['%iowait']).rename(f"{log_name}_iowait").dropna()
-            idle_df = pd.Series(df['%idle']).rename(f"{log_name}_idle").dropna()
-            
-            log_cols.append(user_df)
-            log_cols.append(system_df)
-            log_cols.append(iowait_df)
-            log_cols.append(idle_df)
-        
-        elif "_mem" in log:
-            kbmemfree_df = pd.Series(df['kbmemfree']).rename(f"{log_name}_mem_kbmemfree").dropna()
-            kbmemused_df = pd.Series(df['kbmemused']).rename(f"{log_name}_mem_kbmemused").dropna()
-            percent_mem_used_df = pd.Series(df['%memused']).rename(f"{log_name}_mem_percentmemused").dropna()
-
-            log_cols.append(kbmemfree_df)         
-            log_cols.append(kbmemused_df)
-            log_cols.append(percent_mem_used_df)
-    
-        elif "_dev" in log:
-            df = df[df['IFACE'] == "eth0"].reset_index()
-            rxpck_df = pd.Series(df['rxpck/s']).rename(f"{log_name}_rxpck").dropna()
-            txpck_df = pd.Series(df['txpck/s']).rename(f"{log_name}_txpck").dropna()
-            rxkB_df = pd.Series(df['rxkB/s']).rename(f"{log_name}_rxkB").dropna()
-            txkB_df = pd.Series(df['txkB/s']).rename(f"{log_name}_txkB").dropna()
-            rxmcst_df = pd.Series(df['rxmcst/s']).rename(f"{log_name}_rxmcst").dropna()
-            
-            log_cols.append(rxpck_df)
-            log_cols.append(txpck_df)
-            log_cols.append(rxkB_df)
-            log_cols.append(txkB_df)
-            log_cols.append(rxmcst_df)
-            
-        elif "_edev" in log:
-            rxerr_df = pd.Series(df['rxerr/s']).rename(f"{log_name}_rxerr").dropna()
-            txerr_df = pd.Series(df['txerr/s']).rename(f"{log_name}_txerr").dropna()
-            coll_df = pd.Series(df['coll/s']).rename(f"{log_name}_coll").dropna()
-            
-            log_cols.append(rxerr_df)
-            log_cols.append(txerr_df)
-            log_cols.append(coll_df)
-    
     pub_files = [(os.path.join( test, _ )) for _ in os.listdir(test) if "pub" in _]
-    
+
     if len(pub_files) == 0:
-        console.print(f"{test} has no pub files.", style="bold red")
-        continue
+        return f"{test} has no pub files."
 
     pub0_csv = pub_files[0]
-    
+
     sub_files = [(os.path.join( test, _ )) for _ in os.listdir(test) if "sub" in _]
 
-    test_df = pd.DataFrame()
+    # ? Parse every sub file once and build all of the sub metrics from it
+    sub_dfs = get_sub_dfs(sub_files)
+
+    if not os.path.exists(summaries_dir):
+        os.mkdir(summaries_dir)
+
+    summary_paths = get_summary_paths(test, summaries_dir)
 
-    # ? Add the metrics for the entire test
-    latencies = get_latencies(pub0_csv)
+    # ? Add the metrics for the entire test, the latency sketch is filled while pub_0.csv is read
+    # ? Raw latencies (in μs) go straight into the .npy that the visualiser and later runs memory-map
+    latency_sketch = new_sketch()
+    latencies = get_latencies(pub0_csv, latency_sketch, get_latency_array_path(summaries_dir, test))
     if latencies is None:
-        continue    
+        return f"Couldn't get latencies from {pub0_csv}."
 
-    latencies = latencies.rename("latency_us")
-    total_throughput_mbps = get_total_sub_metric(sub_files, "mbps").rename("total_throughput_mbps")
-    total_sample_rate = get_total_sub_metric(sub_files, "samples/s").rename("total_sample_rate")
-    total_samples_received = pd.Series([get_total_sub_metric(sub_files, "total samples").max()]).rename("total_samples_received")
-    total_samples_lost = pd.Series([get_total_sub_metric(sub_files, "lost samples").max()]).rename("total_samples_lost")
+    total_throughput_mbps = get_total_sub_metric(sub_dfs, "mbps").rename("total_throughput_mbps")
+    total_sample_rate = get_total_sub_metric(sub_dfs, "samples/s").rename("total_sample_rate")
+    total_samples_received = pd.Series([get_total_sub_metric(sub_dfs, "total samples").max()]).rename("total_samples_received")
+    total_samples_lost = pd.Series([get_total_sub_metric(sub_dfs, "lost samples").max()]).rename("total_samples_lost")
     pub_allocation_per_machine = pd.Series(get_participant_allocation_per_machine('pub', test)).rename("pub_allocation_per_machine")
     sub_allocation_per_machine = pd.Series(get_participant_allocation_per_machine('sub', test)).rename("sub_allocation_per_machine")
 
+    # ? Everything but the latencies, which are added chunk by chunk as the summary is written
     test_df = pd.concat([
-        latencies,
         total_throughput_mbps,
         total_sample_rate,
         total_samples_received,    
@@ -293,36 +341,236 @@ for i in track( range( len(usable_tests) ), description="Summarising tests...",
         pub_allocation_per_machine,
         sub_allocation_per_machine
     ] + [col for col in log_cols], axis=1)
-    
+
     # ? Add the metrics for each sub
-    for sub_file in sub_files:
+    sub_cols = []
+
+    for sub_file, sub_df in sub_dfs.items():
         sub_i = sub_files.index(sub_file)
-        
-        throughput_mbps = get_metric_per_sub(sub_file, "mbps").rename(f"sub_{sub_i}_throughput_mbps")
-        
-        sample_rate = get_metric_per_sub(sub_file, "samples/s").rename(f"sub_{sub_i}_sample_rate")
-        
-        total_samples_received = pd.Series([get_metric_per_sub(sub_file, "total samples").max()])
+
+        throughput_mbps = get_metric_per_sub(sub_df, "mbps").rename(f"sub_{sub_i}_throughput_mbps")
+
+        sample_rate = get_metric_per_sub(sub_df, "samples/s").rename(f"sub_{sub_i}_sample_rate")
+
+        total_samples_received = pd.Series([get_metric_per_sub(sub_df, "total samples").max()])
         total_samples_received = total_samples_received.rename(f"sub_{sub_i}_total_samples_received")
-        
-        total_samples_lost = pd.Series([get_metric_per_sub(sub_file, "lost samples").max()])
+
+        total_samples_lost = pd.Series([get_metric_per_sub(sub_df, "lost samples").max()])
         total_samples_lost = total_samples_lost.rename(f"sub_{sub_i}_total_samples_lost")
-        
-        test_df = pd.concat([
-            test_df, 
+
+        sub_cols += [
             throughput_mbps,
             sample_rate,
             total_samples_received,
             total_samples_lost    
-        ], axis=1)
+        ]
+
+    test_df = pd.concat([test_df] + sub_cols, axis=1)
+    
+    # ? Keep float dtypes and nulls in the columnar copy
+    if pyarrow is not None:
+        write_atomically(summary_paths["parquet"], lambda path: write_summary_parquet(path, latencies, test_df))
+
+    write_atomically(summary_paths["csv"], lambda path: write_summary_csv(path, latencies, test_df))
+    
+    # ? The visualiser only trusts a latency array at least as new as the summary, which was just written from it
+    os.utime(summary_paths["latency_array"])
+    
+    # ? Latency sketch (in μs) for percentiles and CDFs with bounded memory
+    save_sketch(summary_paths["latency_sketch"], latency_sketch)
+    
+    # ? System usage in long format with the sar timestamps
+    save_sar_df(summary_paths["sar"], sar_df)
+    
+    # ? Latency, throughput, sample rate and system usage per second of the run, for time-aligned plots
+    first_sub_total_samples = get_metric_per_sub(sub_dfs[sorted(sub_dfs)[0]], "total samples") if sub_dfs else []
+    timeline = get_timeline(
+        latencies,
+        first_sub_total_samples,
+        get_latency_count_setting(test),
+        [total_throughput_mbps, total_sample_rate],
+        sar_df
+    )
+    save_timeline(summary_paths["timeline"], timeline)
+    
+    # ? Aggregates go in last so they're never older than the summaries they describe
+    aggregates = get_test_aggregates(test_df, latency_sketch)
+    write_atomically(summary_paths["aggregates"], lambda path: write_json(path, aggregates))
+
+def summarise_test_worker(test, summaries_dir):
+    """
+    Pool entry point: never raises so one broken test can't take down the rest.
+    """
+    outputs = {}
+    
+    try:
+        issue = summarise_test(test, summaries_dir)
+        
+        if issue is None:
+            for path in get_summary_paths(test, summaries_dir).values():
+                if os.path.exists(path):
+                    outputs[os.path.basename(path)] = hash_file(path)
+    except Exception as e:
+        issue = f"{type(e).__name__}: {e}"
+        
+    return test, issue, outputs
+
+def summarise_tests(tests, summaries_dir, jobs=1, fingerprints={}):
+    """
+    Summarise tests, recording each result in the manifest as soon as it's in.
+    
+    fingerprints maps each test name to the input fingerprint stored with its record.
+    """
+    description = f"Summarising {len(tests)} tests using {jobs} process(es)..."
+    
+    report = []
+    
+    def record_result(test, issue, outputs):
+        testname = os.path.basename(test)
+        
+        append_manifest_record(summaries_dir, {
+            "test": testname,
+            "inputs": fingerprints.get(testname, {}),
+            "outputs": outputs,
+            "status": "done" if issue is None else "failed",
+            "issue": issue
+        })
+        
+        if issue is not None:
+            report.append({"test": testname, "issue": issue})
+    
+    if jobs <= 1:
+        for test in track(tests, description=description, update_period=1):
+            record_result(*summarise_test_worker(test, summaries_dir))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(summarise_test_worker, test, summaries_dir) for test in tests]
+            
+            for future in track(as_completed(futures), total=len(futures), description=description, update_period=1):
+                record_result(*future.result())
+    
+    return report
+
+def print_report(report):
+    if len(report) == 0:
+        return
+    
+    table = Table(title=f"{len(report)} Test(s) With Issues", show_lines=True)
+    table.add_column("Test", style="bold")
+    table.add_column("Issue", style="red")
+    
+    for item in report:
+        table.add_row(item["test"], item["issue"])
+        
+    console.print(table)
+
+def get_option(args, option, default):
+    """
+    Pull "<option> <value>" out of args and return the value (or default).
+    """
+    if option not in args:
+        return default
+    
+    i = args.index(option)
+    value = args[i + 1] if i + 1 < len(args) else default
+    del args[i:i + 2]
+    
+    return value
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+
+    jobs = int(get_option(args, "--jobs", 1))
+    link_mode = get_option(args, "--link-mode", "copy")
+    
+    if link_mode not in LINK_MODES:
+        console.print(f"--link-mode must be one of {', '.join(LINK_MODES)} but found {link_mode}.", style="bold red")
+        sys.exit()
 
-    # ? Replace NaN with ""
-    test_df = test_df.fillna("")
+    if len(args) < 3:
+        console.print(f"Expected at least 3 args but found {len(args)}. Refer to the readme for help.", style="bold red")
+        sys.exit()
 
+    raw_dir = args[0]
+    usable_dir = args[1]
+    summaries_dir = args[2]
+
+    console.print(f"Working on {os.path.basename(raw_dir)}...\n\n", style="bold white")
+
+    if not os.path.exists(raw_dir):
+        console.print(f"The path {raw_dir} doesn't exist.", style="bold red")
+        sys.exit()
+
+    if "debug" in args:
+        try:
+            shutil.rmtree(usable_dir)
+            shutil.rmtree(summaries_dir)
+        except FileNotFoundError as e:
+            None
+
+    """
+    1. Find usable tests.
+    2. Copy usable tests over to usable_dir.
+    3. Summarise tests in usable_dir.
+    4. Index the test summaries.
+    """
+
+    report = []
+
+    # ? 1. Find usable tests.
+    test_dirs = [f.path for f in os.scandir(raw_dir) if f.is_dir()]
+
+    usable_test_dirs = []
+
+    for test_dir in test_dirs:
+        expected_csv_count = get_expected_csv_count_from_testname(os.path.basename(test_dir))
+        actual_csv_count = get_actual_csv_count(test_dir)
+    
+        if expected_csv_count == actual_csv_count:
+            usable_test_dirs.append(test_dir)
+        else:
+            report.append({
+                "test": os.path.basename(test_dir),
+                "issue": f"Expected {expected_csv_count} csv files and found {actual_csv_count} instead."
+            })
+
+    usable_percentage = int(len(usable_test_dirs) / len(test_dirs) * 100)
+
+    # ? Only tests that are new, changed or failed last time need any more work
     if not os.path.exists(summaries_dir):
-        os.mkdir(summaries_dir)
+        os.makedirs(summaries_dir)
+    
+    manifest = load_manifest(summaries_dir)
+    fingerprints = {os.path.basename(test_dir): get_input_fingerprint(test_dir) for test_dir in usable_test_dirs}
+    
+    pending_test_dirs = [
+        test_dir for test_dir in usable_test_dirs 
+        if not test_is_up_to_date(manifest.get(os.path.basename(test_dir)), fingerprints[os.path.basename(test_dir)], summaries_dir)
+    ]
+    
+    console.print(f"{len(usable_test_dirs) - len(pending_test_dirs)} usable tests are already up to date.", style="bold white")
 
-    summary_csv_path = os.path.join(summaries_dir, f"{os.path.basename(test)}_summary.csv")
+    # ? 2. Copy (or link) usable tests over to usable_dir.
+    if link_mode == "none":
+        usable_tests = pending_test_dirs
+    else:
+        if not os.path.exists(usable_dir):
+            os.makedirs(usable_dir)
+        
+        for i in track(range(len(pending_test_dirs)), description=f"Using {link_mode} for {len(pending_test_dirs)} new or changed usable tests out of {len(test_dirs)} ({usable_percentage}% usable) total tests...\n"):
+            pending_test_dir = pending_test_dirs[i]
+            dest = os.path.join(usable_dir, os.path.basename(pending_test_dir))
+            
+            link_test(pending_test_dir, dest, link_mode)
+            
+        usable_tests = [os.path.join(usable_dir, os.path.basename(test_dir)) for test_dir in pending_test_dirs]
+
+    # ? 3. Summarise the usable tests.
+    report += summarise_tests(usable_tests, summaries_dir, jobs, fingerprints)
     
-    if not os.path.exists(summary_csv_path):
-        test_df.to_csv(summary_csv_path, sep=",")
\ No newline at end of file
+    # ? 4. Index the summaries so the visualiser doesn't have to scan them.
+    with console.status("Updating the campaign index..."):
+        index = update_campaign_index(summaries_dir)
+    console.print(f"Indexed {len(index['tests'])} test summaries.", style="bold white")
+
+    print_report(report)
@@ -0,0 +1,225 @@
+import os
+import numpy as np
+import pandas as pd
+
+from atomic import write_atomically
+
+# ? sar log written for each VM of a test, e.g. csr-dds-app1_cpu.log
+SAR_LOGS = ["cpu", "mem", "dev", "edev"]
+
+# ? sar columns kept from each log and the metric name they're stored under
+SAR_METRICS = {
+    "cpu": {"%user": "user", "%system": "system", "%iowait": "iowait", "%idle": "idle"},
+    "mem": {"kbmemfree": "kbmemfree", "kbmemused": "kbmemused", "%memused": "percentmemused"},
+    "dev": {"rxpck/s": "rxpck", "txpck/s": "txpck", "rxkB/s": "rxkB", "txkB/s": "txkB", "rxmcst/s": "rxmcst"},
+    "edev": {"rxerr/s": "rxerr", "txerr/s": "txerr", "coll/s": "coll"}
+}
+
+# ? Only this interface is kept from the per-interface network logs
+SAR_INTERFACE = "eth0"
+
+# ? Wider than any sar report so that no row is cut short
+SAR_MAX_FIELDS = 32
+
+SAR_COLUMNS = ["vm", "log", "metric", "timestamp", "value"]
+
+def get_sar_logs(log_dir):
+    """
+    (vm, log, path) of every sar log in a test's logs folder, sorted by vm and log.
+    """
+    sar_logs = []
+    
+    for file in sorted(os.listdir(log_dir)):
+        for log in SAR_LOGS:
+            if file.endswith(f"_{log}.log"):
+                sar_logs.append((file[:-len(f"_{log}.log")], log, os.path.join(log_dir, file)))
+    
+    return sar_logs
+
+def get_sar_date(log_file):
+    """
+    Date from the "Linux ... (host) <date> ..." line sar starts every log with,
+    or 1970-01-01 if there isn't one.
+    """
+    with open(log_file, "r", errors="replace") as f:
+        banner = f.readline().split()
+    
+    for field in banner:
+        date = pd.to_datetime(field, format="%m/%d/%Y", errors="coerce")
+        if pd.isna(date):
+            date = pd.to_datetime(field, format="%Y-%m-%d", errors="coerce")
+        if not pd.isna(date):
+            return date
+    
+    return pd.Timestamp("1970-01-01")
+
+def get_sar_timestamps(date, times):
+    """
+    Turn sar's time of day column into timestamps, moving to the next day
+    whenever the time goes backwards (the run crossed midnight).
+    """
+    times = pd.Series(times).reset_index(drop=True)
+    
+    twelve_hour = times.str.endswith(("AM", "PM")).any()
+    parsed = pd.to_datetime(times, format="%I:%M:%S %p" if twelve_hour else "%H:%M:%S", errors="coerce")
+    time_of_day = parsed - parsed.dt.normalize()
+    
+    days = (time_of_day.diff() < pd.Timedelta(0)).cumsum()
+    
+    return (date + time_of_day + pd.to_timedelta(days, unit="D")).to_numpy()
+
+def read_sar_log(log_file):
+    """
+    Parse a sar text log (sar -u, -r, -n DEV or -n EDEV) in one pass.
+    
+    Returns a frame with a timestamp column followed by the sar report's own
+    columns. sar repeats its header line every so often and ends each report
+    with "Average:" rows, both are dropped.
+    """
+    raw = pd.read_csv(
+        log_file,
+        sep=r"\s+",
+        header=None,
+        names=range(SAR_MAX_FIELDS),
+        skiprows=1,
+        dtype=str,
+        on_bad_lines="skip"
+    )
+    raw = raw.dropna(axis=1, how="all")
+    raw = raw[~raw[0].str.startswith("Average")]
+    
+    if len(raw) == 0:
+        return pd.DataFrame(columns=["timestamp"])
+    
+    # ? 12 hour clocks split the time over 2 fields
+    if raw[1].isin(["AM", "PM"]).all():
+        raw[0] = raw[0] + " " + raw[1]
+        raw = raw.drop(columns=1)
+        raw.columns = range(raw.shape[1])
+    
+    header = raw.iloc[0]
+    header_rows = (raw[1] == header[1]) & (raw[2] == header[2])
+    
+    columns = header.dropna().tolist()[1:]
+    
+    df = raw[~header_rows].iloc[:, :len(columns) + 1]
+    df.columns = ["time"] + columns
+    df = df.reset_index(drop=True)
+    
+    df.insert(0, "timestamp", get_sar_timestamps(get_sar_date(log_file), df.pop("time")))
+    
+    return df
+
+def read_sar_logs(log_dir):
+    """
+    Every sar log of a test as one long frame with a row per (vm, log, metric, timestamp).
+    
+    Only the columns in SAR_METRICS are kept, and for the network logs only
+    SAR_INTERFACE's rows.
+    """
+    frames = []
+    
+    for vm, log, log_file in get_sar_logs(log_dir):
+        df = read_sar_log(log_file)
+        
+        if "IFACE" in df.columns:
+            df = df[df["IFACE"] == SAR_INTERFACE]
+        
+        for sar_column, metric in SAR_METRICS[log].items():
+            if sar_column not in df.columns:
+                continue
+            
+            frames.append(pd.DataFrame({
+                "vm": vm,
+                "log": log,
+                "metric": metric,
+                "timestamp": df["timestamp"].to_numpy(),
+                "value": pd.to_numeric(df[sar_column], errors="coerce").to_numpy(dtype=float)
+            }))
+    
+    if len(frames) == 0:
+        return get_typed_sar_df(pd.DataFrame(columns=SAR_COLUMNS))
+    
+    return get_typed_sar_df(pd.concat(frames, ignore_index=True))
+
+def get_typed_sar_df(sar_df):
+    sar_df = sar_df[SAR_COLUMNS].copy()
+    
+    for column in ["vm", "log", "metric"]:
+        sar_df[column] = sar_df[column].astype("category")
+    sar_df["timestamp"] = pd.to_datetime(sar_df["timestamp"])
+    sar_df["value"] = sar_df["value"].astype("float64")
+    
+    return sar_df
+
+def get_sar_column_name(vm, log, metric):
+    # ? Memory columns have always been called <vm>_mem_mem_<metric> in the summaries
+    if log == "mem":
+        return f"{vm}_mem_mem_{metric}"
+    
+    return f"{vm}_{log}_{metric}"
+
+def get_sar_series(sar_df):
+    """
+    One series per (vm, log, metric) named like the summary's system columns,
+    indexed from 0 like the rest of the summary.
+    """
+    series = []
+    
+    for (vm, log, metric), df in sar_df.groupby(["vm", "log", "metric"], observed=True, sort=False):
+        series.append(
+            pd.Series(df["value"].to_numpy(), name=get_sar_column_name(vm, log, metric)).dropna().reset_index(drop=True)
+        )
+    
+    return series
+
+def parse_sar_column_name(column):
+    """
+    (vm, log, metric) of a summary's system column, the reverse of
+    get_sar_column_name, or None if column isn't one.
+    """
+    for log, metrics in SAR_METRICS.items():
+        prefix = "_mem_mem_" if log == "mem" else f"_{log}_"
+        if prefix not in column:
+            continue
+        
+        vm, metric = column.rsplit(prefix, 1)
+        if metric in metrics.values():
+            return vm, log, metric
+    
+    return None
+
+def get_sar_df_from_summary(summary_df):
+    """
+    Long sar frame rebuilt from the system columns of a summary written before
+    the sar frames were saved. Those don't have timestamps so the row number
+    is used as the number of seconds since the start.
+    """
+    frames = []
+    
+    for column in summary_df.columns:
+        parsed = parse_sar_column_name(column)
+        if parsed is None:
+            continue
+        
+        vm, log, metric = parsed
+        values = pd.to_numeric(summary_df[column], errors="coerce").dropna()
+        
+        frames.append(pd.DataFrame({
+            "vm": vm,
+            "log": log,
+            "metric": metric,
+            "timestamp": pd.Timestamp("1970-01-01") + pd.to_timedelta(np.arange(len(values)), unit="s"),
+            "value": values.to_numpy(dtype=float)
+        }))
+    
+    if len(frames) == 0:
+        return get_typed_sar_df(pd.DataFrame(columns=SAR_COLUMNS))
+    
+    return get_typed_sar_df(pd.concat(frames, ignore_index=True))
+
+def save_sar_df(path, sar_df):
+    write_atomically(path, lambda tmp_path: sar_df.to_csv(tmp_path, index=False))
+
+def load_sar_df(path):
+    return get_typed_sar_df(pd.read_csv(path, parse_dates=["timestamp"]))
@@ -0,0 +1,148 @@
+import json
+import os
+import numpy as np
+
+from atomic import write_atomically
+
+# ? Every quantile read from a sketch is within 1% of the true value
+RELATIVE_ACCURACY = 0.01
+
+def new_sketch(relative_accuracy=RELATIVE_ACCURACY):
+    """
+    Mergeable quantile sketch (DDSketch): positive values are counted in buckets
+    whose bounds grow by gamma = (1 + a) / (1 - a), so the memory used only
+    depends on the range of the values and never on how many there are.
+    """
+    return {
+        "relative_accuracy": relative_accuracy,
+        "counts": {},
+        "zero_count": 0,
+        "count": 0,
+        "sum": 0.0,
+        "m2": 0.0,
+        "min": None,
+        "max": None
+    }
+
+def get_gamma(sketch):
+    accuracy = sketch["relative_accuracy"]
+    
+    return (1 + accuracy) / (1 - accuracy)
+
+def add_to_sketch(sketch, values):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    
+    if len(values) == 0:
+        return sketch
+    
+    positive = values[values > 0]
+    sketch["zero_count"] += int(len(values) - len(positive))
+    
+    keys, counts = np.unique(np.ceil(np.log(positive) / np.log(get_gamma(sketch))).astype(int), return_counts=True)
+    for key, count in zip(keys.tolist(), counts.tolist()):
+        sketch["counts"][key] = sketch["counts"].get(key, 0) + count
+    
+    add_moments(sketch, len(values), float(values.sum()), float(((values - values.mean()) ** 2).sum()))
+    sketch["min"] = float(values.min()) if sketch["min"] is None else min(sketch["min"], float(values.min()))
+    sketch["max"] = float(values.max()) if sketch["max"] is None else max(sketch["max"], float(values.max()))
+    
+    return sketch
+
+def add_moments(sketch, count, total, m2):
+    """
+    Add count values with the given sum and sum of squared deviations from
+    their mean to the sketch's, combined as in Chan et al. so the variance
+    keeps its precision however many chunks are added.
+    """
+    # ? Sketches saved before m2 was kept can't give a variance
+    if sketch["count"] > 0 and count > 0 and sketch.get("m2") is not None and m2 is not None:
+        delta = total / count - sketch["sum"] / sketch["count"]
+        m2 = sketch["m2"] + m2 + delta ** 2 * sketch["count"] * count / (sketch["count"] + count)
+    elif sketch["count"] > 0 and count > 0:
+        m2 = None
+    elif count == 0:
+        m2 = sketch.get("m2")
+    
+    sketch["count"] += int(count)
+    sketch["sum"] += total
+    sketch["m2"] = m2
+
+def merge_sketches(sketches):
+    """
+    Sketch of all the values seen by sketches, e.g. the repeated runs of a test.
+    """
+    merged = new_sketch(sketches[0]["relative_accuracy"] if sketches else RELATIVE_ACCURACY)
+    
+    for sketch in sketches:
+        if sketch["relative_accuracy"] != merged["relative_accuracy"]:
+            raise ValueError("Only sketches with the same relative accuracy can be merged.")
+    
+        for key, count in sketch["counts"].items():
+            merged["counts"][key] = merged["counts"].get(key, 0) + count
+    
+        merged["zero_count"] += sketch["zero_count"]
+        add_moments(merged, sketch["count"], sketch["sum"], sketch.get("m2"))
+    
+        if sketch["count"] > 0:
+            merged["min"] = sketch["min"] if merged["min"] is None else min(merged["min"], sketch["min"])
+            merged["max"] = sketch["max"] if merged["max"] is None else max(merged["max"], sketch["max"])
+    
+    return merged
+
+def get_sketch_buckets(sketch):
+    """
+    Representative value and count of every bucket in increasing order, with
+    zero / negative values first.
+    """
+    gamma = get_gamma(sketch)
+    
+    keys = np.array(sorted(sketch["counts"]), dtype=int)
+    counts = np.array([sketch["counts"][key] for key in keys.tolist()], dtype=float)
+    values = 2 * gamma ** keys / (gamma + 1)
+    
+    if sketch["zero_count"] > 0:
+        values = np.concatenate([[min(sketch["min"], 0)], values])
+        counts = np.concatenate([[sketch["zero_count"]], counts])
+    
+    return values, counts
+
+def get_sketch_quantiles(sketch, quantiles):
+    if sketch["count"] == 0:
+        return np.full(len(quantiles), np.nan)
+    
+    values, counts = get_sketch_buckets(sketch)
+    cumulative_counts = np.cumsum(counts)
+    
+    ranks = np.asarray(quantiles, dtype=float) * (sketch["count"] - 1)
+    positions = np.searchsorted(cumulative_counts, ranks, side="right")
+    
+    # ? The min and max are known exactly so don't let the buckets overshoot them
+    return np.clip(values[np.minimum(positions, len(values) - 1)], sketch["min"], sketch["max"])
+
+def get_sketch_cdf(sketch):
+    """
+    (x, F(x)) points of the sketch's empirical CDF, one per bucket.
+    """
+    if sketch["count"] == 0:
+        return np.array([]), np.array([])
+    
+    values, counts = get_sketch_buckets(sketch)
+    
+    return np.clip(values, sketch["min"], sketch["max"]), np.cumsum(counts) / sketch["count"]
+
+def save_sketch(path, sketch):
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(sketch, f)
+    
+    write_atomically(path, write)
+
+def load_sketch(path):
+    with open(path, "r") as f:
+        sketch = json.load(f)
+    
+    # ? JSON object keys are always strings
+    sketch["counts"] = {int(key): count for key, count in sketch["counts"].items()}
+    
+    return sketch
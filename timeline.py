@@ -0,0 +1,114 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+
+from sar import get_sar_column_name
+from atomic import write_atomically
+
+# ? Percentile of each second's latencies kept in the timeline next to the mean
+TIMELINE_LATENCY_QUANTILE = .99
+
+# ? How many more samples the latencies may imply than the subscribers received (lost samples)
+LATENCY_SAMPLES_TOLERANCE = 1.1
+
+def get_latency_count_setting(test):
+    """
+    Number of samples per latency measurement, from the "<n>lc" part of the test name.
+    """
+    match = re.search(r"_(\d+)lc(_|$)", os.path.basename(test))
+    
+    return int(match.group(1)) if match else None
+
+def get_latency_second_starts(latency_count, total_samples, lat_count):
+    """
+    Index of the first latency measured in each second since the start of the
+    run, so second s covers latencies[starts[s]:starts[s + 1]].
+    
+    perftest doesn't timestamp its rows. It measures a latency every lat_count
+    samples and the subscribers report their total samples once a second, so
+    latency i (taken at sample i * lat_count, counting from 0) falls in the
+    second whose totals bracket that sample. Samples lost at the end of the run would put the last
+    latencies past the final second so those are kept in it. Without usable
+    totals the latencies are spread evenly over the run.
+    
+    Latencies are in time order, so every second is one contiguous slice and
+    the latencies never have to be copied or grouped.
+    """
+    total_samples = pd.to_numeric(pd.Series(total_samples), errors="coerce").dropna().to_numpy(dtype=float)
+    seconds = max(len(total_samples), 1)
+    
+    # ? The totals can't place the latencies if they went backwards or account for far fewer samples
+    if lat_count is None or len(total_samples) == 0 or np.any(np.diff(total_samples) < 0) or (latency_count > 0 and latency_count * lat_count > total_samples[-1] * LATENCY_SAMPLES_TOLERANCE):
+        return np.ceil(np.arange(seconds) * latency_count / seconds).astype(int)
+    
+    samples_before = np.concatenate([[0], total_samples[:-1]])
+    
+    # ? e.g. totals [1000, 2000, 3000] with lat_count 100 start the seconds at latencies [0, 10, 20]
+    return np.clip(np.floor(samples_before / lat_count).astype(int), 0, latency_count)
+
+def get_latency_per_second(latencies, starts):
+    """
+    Mean and TIMELINE_LATENCY_QUANTILE of the latencies measured in each second,
+    read one second's slice at a time.
+    """
+    ends = np.append(starts[1:], len(latencies))
+    rows = {}
+    
+    for second, (start, end) in enumerate(zip(starts, ends)):
+        values = np.asarray(latencies[start:end], dtype=float)
+        values = values[~np.isnan(values)]
+        
+        if len(values) == 0:
+            continue
+        
+        rows[second] = (values.mean(), np.quantile(values, TIMELINE_LATENCY_QUANTILE))
+    
+    return pd.DataFrame.from_dict(rows, orient="index", columns=["latency_mean_us", "latency_p99_us"]).rename_axis("second")
+
+def get_sar_per_second(sar_df, start):
+    """
+    Every (vm, log, metric) of the sar frame averaged over each second since start,
+    one column per series named like the summary's system columns.
+    """
+    if len(sar_df) == 0:
+        return pd.DataFrame()
+    
+    sar_df = sar_df.assign(
+        second=((sar_df["timestamp"] - start).dt.total_seconds() // 1).astype(int),
+        column=[get_sar_column_name(vm, log, metric) for vm, log, metric in zip(sar_df["vm"], sar_df["log"], sar_df["metric"])]
+    )
+    
+    return sar_df.pivot_table(index="second", columns="column", values="value", aggfunc="mean")
+
+def get_timeline(latencies, total_samples, lat_count, interval_series, sar_df):
+    """
+    All of a test's series resampled onto one grid of whole seconds since the
+    start of the run, which is taken to be sar's first sample.
+    
+    interval_series are perftest's once a second series (e.g. throughput), row
+    i covers second i of the run.
+    """
+    starts = get_latency_second_starts(len(latencies), total_samples, lat_count)
+    
+    frames = [get_latency_per_second(latencies, starts)]
+    
+    for series in interval_series:
+        frames.append(pd.to_numeric(series, errors="coerce").dropna().reset_index(drop=True).rename_axis("second").to_frame())
+    
+    start = sar_df["timestamp"].min() if len(sar_df) > 0 else None
+    if start is not None:
+        frames.append(get_sar_per_second(sar_df, start))
+    
+    timeline = pd.concat(frames, axis=1).sort_index()
+    timeline = timeline.reindex(pd.RangeIndex(0, timeline.index.max() + 1 if len(timeline) > 0 else 0, name="second"))
+    
+    timeline.insert(0, "timestamp", start + pd.to_timedelta(timeline.index, unit="s") if start is not None else pd.NaT)
+    
+    return timeline.reset_index()
+
+def save_timeline(path, timeline):
+    write_atomically(path, lambda tmp_path: timeline.to_csv(tmp_path, index=False))
+
+def load_timeline(path):
+    return pd.read_csv(path, parse_dates=["timestamp"])